@@ -0,0 +1,2 @@
+# ecoatlas_api/benchmarks
+# Scripts de mesure (python -m ecoatlas_api.benchmarks.<nom>).
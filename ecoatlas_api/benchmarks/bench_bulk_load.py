@@ -0,0 +1,100 @@
+# ecoatlas_api/benchmarks/bench_bulk_load.py
+"""
+Chargement du catalogue : ancienne boucle ORM (commit + refresh par
+espèce) contre services/bulk_loader (lots + RETURNING, COPY sur PostgreSQL).
+
+    python -m ecoatlas_api.benchmarks.bench_bulk_load [nb_especes] [occ_par_espece]
+
+Par défaut 100 000 espèces x 100 occurrences (10M lignes). L'ancienne
+boucle n'est mesurée que sur LEGACY_SAMPLE espèces, puis extrapolée.
+Sans DATABASE_URL, une base SQLite temporaire est utilisée.
+ATTENTION : la base cible est vidée.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_bulk_load.db"
+
+from .. import database, models  # noqa: E402
+from ..services import bulk_loader  # noqa: E402
+
+LEGACY_SAMPLE = 500
+
+
+def _species(n: int) -> list[dict]:
+    return [
+        {"common_name": f"Espèce {i}", "scientific_name": f"Benchmarkus {i}", "biome": "Forêt"}
+        for i in range(n)
+    ]
+
+
+def _occurrences(species_id: int, per_species: int):
+    rnd = random.Random(species_id)
+    for _ in range(per_species):
+        start = rnd.randint(1900, 2015)
+        yield species_id, rnd.uniform(-90, 90), rnd.uniform(-180, 180), start, start + rnd.randint(0, 25), "MANUAL"
+
+
+def _legacy(db, species: list[dict], per_species: int) -> None:
+    """Reproduit l'ancien species_loader.reload_species_database."""
+    for sp in species:
+        row = models.Species(**sp)
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        for _, lat, lng, start, end, source in _occurrences(row.id, per_species):
+            db.add(models.Occurrence(
+                species_id=row.id, lat=lat, lng=lng, start_year=start, end_year=end, source=source,
+            ))
+        db.commit()
+
+
+def _bulk(db, species: list[dict], per_species: int) -> None:
+    ids = bulk_loader.insert_species(db, species)
+    with bulk_loader.deferred_indexes(db, models.Occurrence):
+        bulk_loader.insert_occurrences(
+            db, (occ for sid in ids for occ in _occurrences(sid, per_species))
+        )
+    db.commit()
+
+
+def _run(label: str, fn, n_species: int, per_species: int) -> float:
+    db = database.SessionLocal()
+    try:
+        bulk_loader.clear_catalog(db)
+        db.commit()
+        t0 = time.perf_counter()
+        fn(db, _species(n_species), per_species)
+        elapsed = time.perf_counter() - t0
+    finally:
+        db.close()
+
+    rows = n_species * (1 + per_species)
+    print(f"  {label:<28} {n_species:>7} espèces  {elapsed:8.2f} s  {rows / elapsed:>10,.0f} lignes/s")
+    return elapsed
+
+
+def main():
+    n_species = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    per_species = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    models.Base.metadata.create_all(bind=database.engine)
+    dialect = database.engine.dialect
+    print(f"Base : {dialect.name} ({dialect.driver}), {per_species} occurrences / espèce")
+
+    sample = min(LEGACY_SAMPLE, n_species)
+    legacy_s = _run("boucle ORM (échantillon)", _legacy, sample, per_species)
+    bulk_s = _run("bulk_loader", _bulk, n_species, per_species)
+
+    legacy_total = legacy_s * n_species / sample
+    print(f"  boucle ORM extrapolée à {n_species} espèces : {legacy_total:,.0f} s")
+    print(f"  gain : x{legacy_total / bulk_s:.1f}")
+
+
+if __name__ == "__main__":
+    main()
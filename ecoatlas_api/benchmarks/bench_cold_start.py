@@ -0,0 +1,109 @@
+# ecoatlas_api/benchmarks/bench_cold_start.py
+"""
+Démarrage à froid : lance uvicorn dans un processus neuf et mesure
+  - le temps jusqu'à ce que le port réponde ;
+  - le TTFB de la première requête /species ;
+  - avec WARMUP=1, le temps jusqu'à ce que /ready renvoie 200
+    (la première requête n'est alors envoyée qu'après).
+
+    python -m ecoatlas_api.benchmarks.bench_cold_start [nb_runs]
+
+Sans DATABASE_URL, une base SQLite temporaire est créée et chargée
+(species_base.json) avant les mesures.
+"""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_cold_start.db"
+
+from .. import database  # noqa: E402
+from ..schema_upgrade import ensure_schema  # noqa: E402
+
+FIRST_REQUEST = "/species?limit=50"
+TIMEOUT = 60.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port: int, path: str) -> tuple[int, float]:
+    """(statut, TTFB en secondes)."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=TIMEOUT)
+    try:
+        t = time.perf_counter()
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        ttfb = time.perf_counter() - t
+        resp.read()
+        return resp.status, ttfb
+    finally:
+        conn.close()
+
+
+def _wait(port: int, path: str, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            if _get(port, path)[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} indisponible après {TIMEOUT} s")
+
+
+def _run(warmup: bool) -> dict:
+    port = _free_port()
+    env = {**os.environ, "WARMUP": "1" if warmup else "0"}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "ecoatlas_api.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = t0 + TIMEOUT
+        _wait(port, "/", deadline)
+        listening = time.perf_counter() - t0
+        if warmup:
+            _wait(port, "/ready", deadline)
+        ready = time.perf_counter() - t0
+        status, ttfb = _get(port, FIRST_REQUEST)
+        if status != 200:
+            raise RuntimeError(f"{FIRST_REQUEST} -> {status}")
+        return {"listening": listening, "ready": ready, "ttfb": ttfb}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _prepare() -> None:
+    from ..services.species_loader import sync_species_database
+
+    ensure_schema(database.engine)
+    stats = sync_species_database()
+    print(f"Base : {database.engine.url} ({stats['species']} espèces)")
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    _prepare()
+
+    print(f"{'mode':<10} {'écoute':>10} {'prêt':>10} {'TTFB 1re':>10}")
+    for warmup in (False, True):
+        results = [_run(warmup) for _ in range(runs)]
+        avg = {k: sum(r[k] for r in results) / runs * 1000 for k in results[0]}
+        label = "WARMUP=1" if warmup else "WARMUP=0"
+        print(f"{label:<10} {avg['listening']:>8.0f}ms {avg['ready']:>8.0f}ms {avg['ttfb']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# ecoatlas_api/benchmarks/bench_gbif_import.py
+"""
+Import GBIF contre un faux GBIF local (latence simulée par requête,
+pagination comme l'API réelle) : débit de gbif_importer selon la
+concurrence. Sans limite de débit côté client (GBIF_RATE=0).
+
+    python -m ecoatlas_api.benchmarks.bench_gbif_import [nb_especes] [latence_ms]
+
+Sans DATABASE_URL, une base SQLite temporaire est utilisée.
+ATTENTION : la base cible est vidée entre deux mesures.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_gbif_import.db"
+os.environ["GBIF_RATE"] = "0"
+
+LATENCY = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+OCCURRENCES_PER_TAXON = 1000
+CONCURRENCY_LEVELS = (1, 4, 16, 32)
+
+
+class _FakeGbif(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        time.sleep(LATENCY)
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 20))
+        if url.path.endswith("/species/search"):
+            body = {"endOfRecords": False, "results": [
+                {"key": 1000 + i, "scientificName": f"Fakeus {i}", "vernacularName": f"Faux {i}"}
+                for i in range(offset, offset + limit)
+            ]}
+        else:
+            end = min(offset + limit, OCCURRENCES_PER_TAXON)
+            rnd = random.Random(f"{params.get('taxonKey')}:{offset}")
+            taxon = int(params.get("taxonKey"))
+            body = {"endOfRecords": end >= OCCURRENCES_PER_TAXON, "results": [
+                {"key": taxon * 1_000_000 + i, "year": rnd.randint(1950, 2024),
+                 "decimalLatitude": rnd.uniform(-90, 90), "decimalLongitude": rnd.uniform(-180, 180)}
+                for i in range(offset, end)
+            ]}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    n_species = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGbif)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GBIF_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    # Après GBIF_BASE_URL : l'importeur lit l'URL à l'import
+    from .. import database, gbif_importer
+    from ..schema_upgrade import ensure_schema
+    from ..services import bulk_loader
+    from ..services.http_client import close_http_client
+
+    ensure_schema(database.engine)
+    print(f"Base : {database.engine.dialect.name}, {n_species} espèces, latence {LATENCY * 1000:.0f} ms")
+
+    async def run(concurrency: int) -> float:
+        db = database.SessionLocal()
+        try:
+            bulk_loader.clear_catalog(db)
+            db.commit()
+        finally:
+            db.close()
+        try:
+            stats = await gbif_importer.import_species(n_species, concurrency, restart=True)
+        finally:
+            await close_http_client()
+        return stats["occurrences"] / stats["seconds"]
+
+    results = {c: asyncio.run(run(c)) for c in CONCURRENCY_LEVELS}
+    server.shutdown()
+
+    print(f"{'concurrence':>12} {'occurrences/s':>14}")
+    for c, rate in results.items():
+        print(f"{c:>12} {rate:>14,.0f}  x{rate / results[CONCURRENCY_LEVELS[0]]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
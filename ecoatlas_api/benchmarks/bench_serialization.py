@@ -0,0 +1,106 @@
+# ecoatlas_api/benchmarks/bench_serialization.py
+"""
+Coût par ligne de la sérialisation des occurrences : ancien chemin
+(objets ORM -> validation pydantic from_attributes -> JSON) contre le
+chemin direct (tuples de colonnes -> fast_json).
+
+Sans DATABASE_URL, utilise une base SQLite en mémoire remplie de
+données synthétiques :
+
+    python -m ecoatlas_api.benchmarks.bench_serialization [nb_lignes]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from .. import crud, database, models, schemas  # noqa: E402
+from ..fast_json import dumps, orjson, rows_to_dicts  # noqa: E402
+
+REPEAT = 5
+
+
+def _setup(n: int):
+    if database.DATABASE_URL == "sqlite://":
+        # Une seule connexion, sinon chaque session voit une base vide
+        engine = database.create_engine("sqlite://", poolclass=StaticPool)
+        database.SessionLocal.configure(bind=engine)
+    else:
+        engine = database.engine
+    models.Base.metadata.create_all(bind=engine)
+
+    db = database.SessionLocal()
+    species = db.query(models.Species).filter_by(scientific_name="Benchmarkus serializatus").first()
+    if species is None:
+        species = models.Species(common_name="Bench", scientific_name="Benchmarkus serializatus")
+        db.add(species)
+        db.flush()
+        rnd = random.Random(42)
+        db.execute(
+            models.Occurrence.__table__.insert(),
+            [
+                {
+                    "species_id": species.id,
+                    "lat": rnd.uniform(-90, 90),
+                    "lng": rnd.uniform(-180, 180),
+                    "start_year": (y := rnd.randint(1900, 2020)),
+                    "end_year": y + rnd.randint(0, 5),
+                    "source": "MANUAL",
+                }
+                for _ in range(n)
+            ],
+        )
+        db.commit()
+    return db, species.id
+
+
+def _old_path(db, species_id) -> bytes:
+    occ = crud.get_occurrences_for_species(db, species_id)
+    adapter = TypeAdapter(list[schemas.OccurrenceOut])
+    data = adapter.dump_python(adapter.validate_python(occ, from_attributes=True), mode="json")
+    # Même rendu que starlette.responses.JSONResponse
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _fast_path(db, species_id) -> bytes:
+    rows = crud.get_occurrence_rows_for_species(db, species_id)
+    return dumps(rows_to_dicts(rows, crud.OCCURRENCE_FIELDS))
+
+
+def _measure(fn, db, species_id) -> tuple[float, bytes]:
+    best = float("inf")
+    for _ in range(REPEAT):
+        db.expunge_all()
+        t0 = time.perf_counter()
+        body = fn(db, species_id)
+        best = min(best, time.perf_counter() - t0)
+    return best, body
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    db, species_id = _setup(n)
+    try:
+        rows = len(crud.get_occurrence_rows_for_species(db, species_id))
+        old_s, old_body = _measure(_old_path, db, species_id)
+        fast_s, fast_body = _measure(_fast_path, db, species_id)
+    finally:
+        db.close()
+
+    assert json.loads(old_body) == json.loads(fast_body), "les deux chemins divergent"
+
+    print(f"Occurrences : {rows} lignes, meilleur de {REPEAT} ({'orjson' if orjson else 'json stdlib'})")
+    for label, s in (("ORM + pydantic", old_s), ("tuples + fast_json", fast_s)):
+        print(f"  {label:<20} {s * 1000:8.1f} ms   {s / rows * 1e6:6.2f} µs/ligne")
+    print(f"  gain : x{old_s / fast_s:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,61 @@ CRUD layer – PRO VERSION
 Optimisé pour PostgreSQL & FastAPI.
 """
 
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, and_, or_
+import json
+
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy import select, and_, or_, func, case, cast, distinct, true, false, Integer, any_, literal
+from sqlalchemy.types import ARRAY
 
 from . import models
+from .services import search_index, spatial_index, year_index
+
+
+# ---------------------------------------------------------
+# SPECIES – PROJECTIONS (fields= / include=)
+# ---------------------------------------------------------
+
+SPECIES_SUMMARY_FIELDS = (
+    "id",
+    "common_name",
+    "scientific_name",
+    "life_zone",
+    "biome",
+    "photo_url",
+)
+
+SPECIES_BIO_FIELDS = (
+    "population",
+    "size_adult_cm",
+    "weight_adult_kg",
+    "diet",
+    "lifespan_years",
+    "iucn_status",
+    "habitat",
+    "speed_kmh",
+    "range_description",
+)
+
+SPECIES_FIELDS = SPECIES_SUMMARY_FIELDS + SPECIES_BIO_FIELDS
+
+
+def species_output_fields(fields) -> list[str]:
+    """Champs renvoyés pour `fields` : id toujours, ordre du schéma."""
+    wanted = {"id", *fields}
+    return [f for f in SPECIES_FIELDS if f in wanted]
+
+
+def _species_columns(fields) -> list:
+    """Colonnes de species_output_fields(fields), puis common_name s'il
+    n'y est pas (nécessaire au tri / curseur)."""
+    names = species_output_fields(fields)
+    if "common_name" not in names:
+        names.append("common_name")
+    return [getattr(models.Species, f) for f in names]
+
+
+def _species_load_only(fields):
+    return load_only(*_species_columns(fields))
 
 
 # ---------------------------------------------------------
@@ -22,19 +73,21 @@ def get_species_list(
     search: str | None = None,
     limit: int = 50,
     offset: int = 0,
+    after: tuple | None = None,
+    fields=SPECIES_SUMMARY_FIELDS,
 ):
-    query = db.query(models.Species)
+    """Liste triée par (common_name, id), noms NULL en dernier.
+
+    after = (common_name, id) de la dernière ligne de la page précédente
+    (pagination par curseur) ; l'offset n'est gardé que pour compatibilité.
+    Renvoie des lignes (pas d'objets ORM) avec les seules colonnes de
+    `fields` (+ id, common_name).
+    """
+    query = db.query(*_species_columns(fields))
 
     # Filtre année => seulement les espèces avec au moins UNE occurrence active
     if year is not None:
-        query = query.filter(
-            models.Species.occurrences.any(
-                and_(
-                    models.Occurrence.start_year <= year,
-                    models.Occurrence.end_year >= year,
-                )
-            )
-        )
+        query = query.filter(species_year_filter(db, year))
 
     if life_zone:
         query = query.filter(models.Species.life_zone.ilike(f"%{life_zone}%"))
@@ -43,78 +96,425 @@ def get_species_list(
         query = query.filter(models.Species.biome.ilike(f"%{biome}%"))
 
     if search:
-        s = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                models.Species.common_name.ilike(s),
-                models.Species.scientific_name.ilike(s),
-            )
-        )
+        query = query.filter(species_search_filter(db, search))
+
+    if after is not None:
+        query = query.filter(_species_after(*after))
+        offset = 0
 
     return (
-        query.order_by(models.Species.common_name.asc())
+        query.order_by(
+            models.Species.common_name.asc().nulls_last(),
+            models.Species.id.asc(),
+        )
         .limit(limit)
         .offset(offset)
         .all()
     )
 
 
+def _species_after(common_name: str | None, species_id: int):
+    """Lignes strictement après (common_name, id) dans l'ordre de la liste."""
+    if common_name is None:
+        return and_(models.Species.common_name.is_(None), models.Species.id > species_id)
+    return or_(
+        models.Species.common_name > common_name,
+        and_(models.Species.common_name == common_name, models.Species.id > species_id),
+        models.Species.common_name.is_(None),
+    )
+
+
+# Au-delà, une liste d'ids coûte plus cher à envoyer qu'un filtre SQL classique
+MAX_FILTER_IDS = 5000
+
+
+def species_year_filter(db: Session, year: int):
+    """Filtre "espèce active pendant year", résolu via l'index en mémoire
+    plutôt qu'avec un EXISTS corrélé par espèce."""
+    index = year_index.get_year_index(db)
+    active = index.species_ids(year)
+    if not active:
+        return false()
+    if len(active) <= MAX_FILTER_IDS:
+        return models.Species.id.in_(active)
+
+    inactive = index.inactive_ids(year)
+    if len(inactive) <= MAX_FILTER_IDS:
+        return ~models.Species.id.in_(inactive) if inactive else true()
+
+    return models.Species.occurrences.any(
+        and_(
+            models.Occurrence.start_year <= year,
+            models.Occurrence.end_year >= year,
+        )
+    )
+
+
+def _large_ids_filter(db: Session, ids: list[int]):
+    """id IN (liste longue), envoyée en un seul paramètre (tableau
+    PostgreSQL, JSON sous SQLite) plutôt qu'en milliers de marqueurs."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return models.Species.id == any_(literal(ids, ARRAY(Integer)))
+    if dialect == "sqlite":
+        values = func.json_each(json.dumps(ids)).table_valued("value")
+        return models.Species.id.in_(select(values.c.value))
+    return models.Species.id.in_(ids)
+
+
+def species_search_filter(db: Session, search: str):
+    """Filtre texte résolu via l'index de recherche (accents ignorés).
+
+    Toujours via l'index, quel que soit le nombre de résultats : un ILIKE
+    ne replierait pas les accents ("eleph" et "éléph" divergeraient)."""
+    ids = search_index.get_search_index(db).match_ids(search)
+    if len(ids) <= MAX_FILTER_IDS:
+        return models.Species.id.in_(ids) if ids else false()
+    return _large_ids_filter(db, ids)
+
+
 # ---------------------------------------------------------
 # SPECIES – SINGLE
 # ---------------------------------------------------------
 
-def get_species_by_id(db: Session, species_id: int):
-    return (
-        db.query(models.Species)
-        .options(joinedload(models.Species.occurrences))
-        .filter(models.Species.id == species_id)
-        .first()
-    )
+def get_species_by_id(
+    db: Session,
+    species_id: int,
+    fields=None,
+    occurrences: bool = True,
+):
+    """fields=None => toutes les colonnes ; occurrences=True => toutes les
+    occurrences (requête séparée, pas de JOIN qui duplique l'espèce)."""
+    query = db.query(models.Species)
+    if fields is not None:
+        query = query.options(_species_load_only(fields))
+    if occurrences:
+        query = query.options(selectinload(models.Species.occurrences))
+    return query.filter(models.Species.id == species_id).first()
 
 
 # ---------------------------------------------------------
 # OCCURRENCES
 # ---------------------------------------------------------
 
+# Ordre des champs de schemas.OccurrenceOut
+OCCURRENCE_FIELDS = ("lat", "lng", "start_year", "end_year", "source", "id")
+
+
+def _species_occurrences_query(q, species_id, from_year, to_year, source, limit):
+    q = q.filter(models.Occurrence.species_id == species_id)
+
+    q = filter_occurrence_years(q, from_year, to_year)
+
+    if source:
+        q = q.filter(models.Occurrence.source == source)
+
+    q = q.order_by(models.Occurrence.start_year.asc(), models.Occurrence.id.asc())
+    if limit is not None:
+        q = q.limit(limit)
+    return q
+
+
 def get_occurrences_for_species(
     db: Session,
     species_id: int,
     from_year: int | None = None,
     to_year: int | None = None,
     source: str | None = None,
+    limit: int | None = None,
 ):
-    q = db.query(models.Occurrence).filter(
-        models.Occurrence.species_id == species_id
-    )
+    q = db.query(models.Occurrence)
+    return _species_occurrences_query(q, species_id, from_year, to_year, source, limit).all()
 
+
+def get_occurrence_rows_for_species(
+    db: Session,
+    species_id: int,
+    from_year: int | None = None,
+    to_year: int | None = None,
+    source: str | None = None,
+    limit: int | None = None,
+    fields=OCCURRENCE_FIELDS,
+) -> list[tuple]:
+    """Comme get_occurrences_for_species, mais en tuples `fields`
+    (pas d'objets ORM : sérialisation directe, cf. fast_json)."""
+    q = db.query(*[getattr(models.Occurrence, f) for f in fields])
+    q = _species_occurrences_query(q, species_id, from_year, to_year, source, limit)
+    return [tuple(r) for r in q]
+
+
+def filter_occurrence_years(q, from_year: int | None, to_year: int | None):
+    """Garde les occurrences dont l'intervalle [start_year, end_year]
+    chevauche [from_year, to_year]."""
     if from_year is not None:
         q = q.filter(models.Occurrence.end_year >= from_year)
 
     if to_year is not None:
         q = q.filter(models.Occurrence.start_year <= to_year)
 
+    return q
+
+
+# ---------------------------------------------------------
+# OCCURRENCES – EXPORT (flux)
+# ---------------------------------------------------------
+
+EXPORT_FIELDS = (
+    "id",
+    "species_id",
+    "scientific_name",
+    "lat",
+    "lng",
+    "start_year",
+    "end_year",
+    "source",
+)
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def iter_occurrence_export(
+    db: Session,
+    species_id: int | None = None,
+    from_year: int | None = None,
+    to_year: int | None = None,
+    source: str | None = None,
+    boxes=None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+):
+    """Lots de tuples EXPORT_FIELDS triés par id, lus par curseur serveur
+    (stream_results + yield_per) : mémoire constante quel que soit le total."""
+    q = db.query(
+        models.Occurrence.id,
+        models.Occurrence.species_id,
+        models.Species.scientific_name,
+        models.Occurrence.lat,
+        models.Occurrence.lng,
+        models.Occurrence.start_year,
+        models.Occurrence.end_year,
+        models.Occurrence.source,
+    ).join(models.Species, models.Species.id == models.Occurrence.species_id)
+
+    if species_id is not None:
+        q = q.filter(models.Occurrence.species_id == species_id)
+    q = filter_occurrence_years(q, from_year, to_year)
     if source:
         q = q.filter(models.Occurrence.source == source)
+    if boxes:
+        q = q.filter(occurrence_bbox_filter(boxes))
 
-    return q.order_by(models.Occurrence.start_year.asc()).all()
+    result = db.execute(
+        q.order_by(models.Occurrence.id.asc())
+        .statement.execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    for chunk in result.partitions():
+        yield [tuple(r) for r in chunk]
 
 
 # ---------------------------------------------------------
-# SEARCH
+# OCCURRENCES – CLUSTERS (tuiles carte)
 # ---------------------------------------------------------
 
-def search_species(db: Session, query_text: str, limit: int, offset: int):
-    pattern = f"%{query_text.lower()}%"
-    return (
-        db.query(models.Species)
-        .filter(
-            or_(
-                models.Species.common_name.ilike(pattern),
-                models.Species.scientific_name.ilike(pattern),
+def _grid_index(db: Session, value, origin: float, step: float):
+    """Indice de cellule floor((value - origin) / step), value >= origin.
+
+    PostgreSQL arrondit les CAST vers INTEGER, SQLite tronque :
+    on passe par floor() uniquement là où il est garanti.
+    """
+    expr = (value - origin) / step
+    if db.get_bind().dialect.name == "postgresql":
+        expr = func.floor(expr)
+    return cast(expr, Integer)
+
+
+def _clamp_index(index, grid_size: int):
+    # Les arrondis flottants peuvent donner grid_size en bord de bbox : ces
+    # points sont rangés dans la dernière cellule AVANT le GROUP BY, pour que
+    # le COUNT(DISTINCT species_id) porte sur la cellule entière.
+    return case((index >= grid_size, grid_size - 1), else_=index)
+
+
+def get_occurrence_clusters(
+    db: Session,
+    west: float,
+    south: float,
+    east: float,
+    north: float,
+    grid_size: int,
+    species_id: int | None = None,
+    from_year: int | None = None,
+    to_year: int | None = None,
+    biome: str | None = None,
+):
+    """Agrège les occurrences de la bbox sur une grille grid_size x grid_size.
+
+    Renvoie des tuples (col, row, count, sum_lat, sum_lng, species_count),
+    une ligne par cellule (0 <= col, row < grid_size).
+    Le filtre lat/lng s'appuie sur l'index idx_occ_lat_lng.
+    """
+    col = _clamp_index(_grid_index(db, models.Occurrence.lng, west, (east - west) / grid_size), grid_size)
+    row = _clamp_index(_grid_index(db, models.Occurrence.lat, south, (north - south) / grid_size), grid_size)
+
+    q = db.query(
+        col.label("col"),
+        row.label("row"),
+        func.count(models.Occurrence.id),
+        func.sum(models.Occurrence.lat),
+        func.sum(models.Occurrence.lng),
+        func.count(distinct(models.Occurrence.species_id)),
+    ).filter(
+        models.Occurrence.lat >= south,
+        models.Occurrence.lat < north,
+        models.Occurrence.lng >= west,
+        models.Occurrence.lng < east,
+    )
+
+    cells = occurrence_cells_filter([(west, south, east, north)])
+    if cells is not None:
+        q = q.filter(cells)
+
+    if species_id is not None:
+        q = q.filter(models.Occurrence.species_id == species_id)
+
+    q = filter_occurrence_years(q, from_year, to_year)
+
+    if biome:
+        q = q.join(models.Species).filter(models.Species.biome.ilike(f"%{biome}%"))
+
+    return q.group_by(col, row).all()
+
+
+# ---------------------------------------------------------
+# OCCURRENCES – REQUÊTES SPATIALES (bbox / polygone)
+# ---------------------------------------------------------
+
+def occurrence_cells_filter(boxes):
+    """Pré-filtre sur grid_cell couvrant les bbox (None si trop de plages)."""
+    ranges = spatial_index.cell_ranges(boxes)
+    if len(ranges) > spatial_index.MAX_CELL_RANGES:
+        return None
+    return or_(*[models.Occurrence.grid_cell.between(lo, hi) for lo, hi in ranges])
+
+
+def occurrence_bbox_filter(boxes):
+    """Filtre exact lat/lng sur une ou plusieurs bbox, précédé du pré-filtre
+    grid_cell quand il est assez sélectif."""
+    exact = or_(
+        *[
+            and_(
+                models.Occurrence.lat >= south,
+                models.Occurrence.lat <= north,
+                models.Occurrence.lng >= west,
+                models.Occurrence.lng <= east,
             )
-        )
-        .order_by(models.Species.common_name.asc())
-        .limit(limit)
-        .offset(offset)
+            for west, south, east, north in boxes
+        ]
+    )
+    cells = occurrence_cells_filter(boxes)
+    return exact if cells is None else and_(cells, exact)
+
+
+def get_occurrences_in_bbox(
+    db: Session,
+    west: float,
+    south: float,
+    east: float,
+    north: float,
+    from_year: int | None = None,
+    to_year: int | None = None,
+    limit: int = 1000,
+):
+    """Renvoie (total, species_ids, occurrences[:limit]) pour une bbox
+    (west > east => traversée de l'antiméridien)."""
+    boxes = spatial_index.split_bbox(west, south, east, north)
+    q = db.query(models.Occurrence).filter(occurrence_bbox_filter(boxes))
+    q = filter_occurrence_years(q, from_year, to_year)
+
+    total = q.count()
+    species_ids = [
+        sid
+        for (sid,) in q.with_entities(models.Occurrence.species_id).distinct()
+        .order_by(models.Occurrence.species_id)
+    ]
+    occurrences = q.order_by(models.Occurrence.id.asc()).limit(limit).all()
+    return total, species_ids, occurrences
+
+
+def get_occurrences_in_polygon(
+    db: Session,
+    polygon: spatial_index.PolygonFilter,
+    from_year: int | None = None,
+    to_year: int | None = None,
+    limit: int = 1000,
+    chunk_size: int = 5000,
+):
+    """Comme get_occurrences_in_bbox, pour un polygone GeoJSON : les
+    candidats de la bbox englobante sont testés par lots."""
+    q = db.query(
+        models.Occurrence.id,
+        models.Occurrence.species_id,
+        models.Occurrence.lat,
+        models.Occurrence.lng,
+        models.Occurrence.start_year,
+        models.Occurrence.end_year,
+        models.Occurrence.source,
+    ).filter(occurrence_bbox_filter(polygon.bboxes()))
+    q = filter_occurrence_years(q, from_year, to_year)
+    q = q.order_by(models.Occurrence.id.asc())
+
+    total = 0
+    species_ids: set[int] = set()
+    occurrences = []
+
+    def consume(chunk):
+        nonlocal total
+        flags = polygon.contains_many([r.lat for r in chunk], [r.lng for r in chunk])
+        for row, inside in zip(chunk, flags):
+            if not inside:
+                continue
+            total += 1
+            species_ids.add(row.species_id)
+            if len(occurrences) < limit:
+                occurrences.append(row)
+
+    chunk = []
+    for row in q.yield_per(chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            consume(chunk)
+            chunk = []
+    if chunk:
+        consume(chunk)
+
+    return total, sorted(species_ids), occurrences
+
+
+# ---------------------------------------------------------
+# SEARCH
+# ---------------------------------------------------------
+
+def search_species(
+    db: Session,
+    query_text: str,
+    limit: int,
+    offset: int,
+    after: tuple | None = None,
+):
+    """Recherche classée par pertinence (cf. services/search_index.py).
+
+    Renvoie [(clé de classement, ligne SPECIES_SUMMARY_FIELDS)] ; after = clé de la dernière
+    ligne de la page précédente (pagination par curseur).
+    """
+    index = search_index.get_search_index(db)
+    page = index.page(query_text, limit, offset=offset, after=after)
+    if not page:
+        return []
+
+    ids = [sid for _, sid in page]
+    rows = (
+        db.query(*_species_columns(SPECIES_SUMMARY_FIELDS))
+        .filter(models.Species.id.in_(ids))
         .all()
     )
+    by_id = {sp.id: sp for sp in rows}
+    return [(key, by_id[sid]) for key, sid in page if sid in by_id]
@@ -0,0 +1,36 @@
+# ecoatlas_api/fast_json.py
+"""
+Sérialisation JSON directe pour les grosses listes.
+
+Les routes de liste sélectionnent des tuples de colonnes (pas d'objets
+ORM) et les encodent ici sans passer par la validation pydantic ligne
+par ligne. Le JSON produit est identique à celui du response_model
+(mêmes clés, même ordre). orjson est utilisé s'il est installé, sinon
+le module json de la stdlib.
+"""
+
+import json
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def rows_to_dicts(rows, fields) -> list[dict]:
+    """[(v1, v2…)] -> [{f1: v1, f2: v2…}] (tuples ou Row SQLAlchemy)."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def json_response(content, headers: dict | None = None) -> Response:
+    return Response(content=dumps(content), media_type="application/json", headers=headers)
@@ -1,99 +1,392 @@
 # gbif_importer.py
+"""
+Import d'espèces GBIF (taxons + occurrences), reprenable.
+
+Pipeline :
+  - les taxons sont listés page par page (TAXON_PAGE) jusqu'à `limit`,
+    les occurrences de chaque taxon page par page (OCCURRENCE_PAGE)
+    jusqu'à `max_occurrences` ;
+  - CONCURRENCY taxons au plus sont récupérés en parallèle (sémaphore),
+    sur le client HTTP partagé (keep-alive), à RATE requêtes/s au plus,
+    avec reprise (backoff exponentiel, Retry-After) sur 429 / 5xx ;
+  - chaque page d'occurrences passe par une asyncio.Queue bornée (les
+    requêtes ralentissent si l'écriture ne suit pas) ;
+  - un seul writer vide la file par lots de WRITE_BATCH pages et les
+    écrit en bloc dans un thread, hors de la boucle asyncio : une
+    transaction par lot.
+
+Espèces et occurrences sont écrites en upsert sur leurs clés GBIF
+(gbif_id, gbif_key) : réimporter (--restart, autre job) met à jour les
+lignes existantes au lieu de les dupliquer.
+
+Reprise : l'avancement est écrit dans import_checkpoints dans la même
+transaction que les données (models.ImportCheckpoint). Un import
+interrompu reprend les taxons inachevés à leur offset d'occurrences,
+puis la liste des taxons à la page suivante ; rien n'est relu ni
+réinséré. Relancer avec un `limit` plus grand poursuit le même job.
+
+    python -m ecoatlas_api.gbif_importer [nb_especes] [concurrence] [--restart]
+"""
 
 import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
 
 from .database import SessionLocal, engine
 from . import models
+from .schema_upgrade import ensure_schema
+from .services import bulk_loader, data_version
+from .services.http_client import close_http_client, get_async_client
 
-GBIF_SPECIES_SEARCH = "https://api.gbif.org/v1/species/search"
-GBIF_OCCURRENCES = "https://api.gbif.org/v1/occurrence/search"
-
-
-async def fetch_json(client, url, params=None):
-    r = await client.get(url, params=params, timeout=20.0)
-    r.raise_for_status()
-    return r.json()
-
-
-async def import_species(limit=500):
-    print(f"🔎 Import GBIF – récupération de {limit} espèces...")
-
-    async with httpx.AsyncClient() as client:
-        # 1. Récupérer une liste de taxons animaux (kingdom = Animalia)
-        search_params = {
-            "kingdomKey": 1,  # Animalia
-            "limit": limit,
-            "offset": 0
-        }
-        data = await fetch_json(client, GBIF_SPECIES_SEARCH, params=search_params)
-        results = data.get("results", [])
-
-        print(f"📌 {len(results)} espèces trouvées dans la liste GBIF")
-
-        db: Session = SessionLocal()
-
-        for idx, entry in enumerate(results):
-            try:
-                species = models.Species(
-                    gbif_id=entry.get("key"),
-                    scientific_name=entry.get("scientificName", "Unknown"),
-                    common_name=entry.get("vernacularName"),
-                    life_zone=None,
-                    biome=None,
-                    population=None,
-                    size_newborn_cm=None,
-                    size_adult_cm=None,
-                    weight_newborn_kg=None,
-                    weight_adult_kg=None,
-                    photo_url=None,
-                )
-                db.add(species)
-                db.commit()
-                db.refresh(species)
-
-                # 2. Récupérer les occurrences associées
-                occ_params = {
-                    "taxonKey": entry.get("key"),
-                    "limit": 200,
-                    "hasCoordinate": "true"
-                }
-                occ_data = await fetch_json(client, GBIF_OCCURRENCES, params=occ_params)
-                occurrences = occ_data.get("results", [])
-
-                for occ in occurrences:
-                    if "decimalLatitude" in occ and "decimalLongitude" in occ:
-                        occ_item = models.Occurrence(
-                            species_id=species.id,
-                            lat=occ["decimalLatitude"],
-                            lng=occ["decimalLongitude"],
-                            start_year=occ.get("year"),
-                            end_year=occ.get("year"),
-                            source="GBIF",
-                        )
-                        db.add(occ_item)
-
-                # Ajouter entrée "source"
-                src = models.Source(
-                    species_id=species.id,
-                    source_name="GBIF",
-                    field_name="taxon",
-                    value_raw=str(entry),
-                )
-                db.add(src)
-
-                db.commit()
-
-                print(f"  ✔ Importé {idx+1}/{limit} : {species.scientific_name}")
-
-            except Exception as e:
-                print(f"⚠️ Erreur import espèce {idx}: {e}")
+GBIF_BASE_URL = os.getenv("GBIF_BASE_URL", "https://api.gbif.org/v1")
+GBIF_SPECIES_SEARCH = f"{GBIF_BASE_URL}/species/search"
+GBIF_OCCURRENCES = f"{GBIF_BASE_URL}/occurrence/search"
+
+JOB = "gbif:animalia"
+JOB_ROW = 0  # taxon_key de la ligne du job dans import_checkpoints
+
+CONCURRENCY = int(os.getenv("GBIF_CONCURRENCY", "8"))
+RATE = float(os.getenv("GBIF_RATE", "10"))  # requêtes / s (0 = sans limite)
+MAX_OCCURRENCES = int(os.getenv("GBIF_MAX_OCCURRENCES", "10000"))  # par taxon
+
+TAXON_PAGE = 100
+OCCURRENCE_PAGE = 300  # maximum accepté par l'API GBIF
+WRITE_BATCH = 50
+
+MAX_RETRIES = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+_DONE = object()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ---------------------------------------------------------
+# HTTP : débit limité + reprise
+# ---------------------------------------------------------
 
+class RateLimiter:
+    """Espace les requêtes d'au moins 1 / rate seconde (toutes tâches confondues)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _backoff(attempt: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _retry_after(r: httpx.Response) -> float | None:
+    try:
+        return min(BACKOFF_MAX, float(r.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+
+async def fetch_json(client, url, params=None, limiter: RateLimiter | None = None):
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter is not None:
+            await limiter.wait()
+        try:
+            r = await client.get(url, params=params, timeout=20.0)
+        except httpx.TransportError as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay, reason = _backoff(attempt), type(e).__name__
+        else:
+            if r.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                r.raise_for_status()
+                return r.json()
+            delay, reason = _retry_after(r) or _backoff(attempt), f"HTTP {r.status_code}"
+        print(f"[WARN] GBIF {reason}, nouvel essai dans {delay:.1f} s ({attempt + 1}/{MAX_RETRIES})")
+        await asyncio.sleep(delay)
+
+
+# ---------------------------------------------------------
+# Checkpoints
+# ---------------------------------------------------------
+
+def reset_checkpoints(job: str = JOB) -> None:
+    """Oublie l'avancement du job (les données déjà importées restent)."""
+    db = SessionLocal()
+    try:
+        db.query(models.ImportCheckpoint).filter(models.ImportCheckpoint.job == job).delete()
+        db.commit()
+    finally:
         db.close()
 
-    print("🎉 Import terminé !")
+
+def _load_checkpoint(job: str) -> tuple[int, list[tuple[int, int, int]]]:
+    """(taxon_offset, [(taxon_key, species_id, occurrence_offset)] inachevés)."""
+    db = SessionLocal()
+    try:
+        cp = models.ImportCheckpoint
+        job_row = db.get(cp, (job, JOB_ROW))
+        if job_row is None:
+            db.add(cp(job=job, taxon_key=JOB_ROW, taxon_offset=0, updated_at=_now()))
+            db.commit()
+            return 0, []
+        pending = db.query(cp.taxon_key, cp.species_id, cp.occurrence_offset).filter(
+            cp.job == job, cp.taxon_key != JOB_ROW, cp.done.is_(False)
+        ).all()
+        return job_row.taxon_offset, [tuple(p) for p in pending]
+    finally:
+        db.close()
+
+
+def _register_taxa(job: str, entries: list[dict], next_offset: int) -> list[tuple[int, int, int]]:
+    """Crée les espèces des nouveaux taxons de la page + leurs checkpoints
+    et avance taxon_offset, en une transaction. Renvoie les taxons à traiter."""
+    db = SessionLocal()
+    try:
+        cp = models.ImportCheckpoint
+        keys = [e["key"] for e in entries if e.get("key")]
+        known = {
+            k for (k,) in db.query(cp.taxon_key).filter(cp.job == job, cp.taxon_key.in_(keys))
+        } if keys else set()
+        new = [e for e in entries if e.get("key") and e["key"] not in known]
+
+        ids = bulk_loader.upsert_species(db, [_species_row(e) for e in new])
+        now = _now()
+        if new:
+            # Taxon déjà importé par un autre job : sa source est remplacée
+            db.query(models.Source).filter(
+                models.Source.species_id.in_(ids),
+                models.Source.source_name == "GBIF",
+                models.Source.field_name == "taxon",
+            ).delete(synchronize_session=False)
+            db.execute(insert(models.Source), [
+                {"species_id": species_id, "source_name": "GBIF", "field_name": "taxon", "value_raw": str(e)}
+                for species_id, e in zip(ids, new)
+            ])
+            db.execute(insert(cp), [
+                {"job": job, "taxon_key": e["key"], "species_id": species_id,
+                 "occurrence_offset": 0, "done": False, "updated_at": now}
+                for species_id, e in zip(ids, new)
+            ])
+        db.execute(
+            update(cp).where(cp.job == job, cp.taxon_key == JOB_ROW)
+            .values(taxon_offset=next_offset, updated_at=now)
+        )
+        db.commit()
+        return [(e["key"], species_id, 0) for species_id, e in zip(ids, new)]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------
+# Lignes à insérer
+# ---------------------------------------------------------
+
+def _species_row(entry: dict) -> dict:
+    return {
+        "gbif_id": entry.get("key"),
+        "scientific_name": entry.get("scientificName", "Unknown"),
+        "common_name": entry.get("vernacularName"),
+    }
+
+
+def _occurrence_rows(species_id: int, occurrences: list[dict]):
+    for occ in occurrences:
+        if "decimalLatitude" in occ and "decimalLongitude" in occ:
+            year = occ.get("year")
+            yield species_id, occ["decimalLatitude"], occ["decimalLongitude"], year, year, "GBIF", occ.get("key")
+
+
+def _write_batch(job: str, batch: list[tuple]) -> int:
+    """Insère un lot de pages (taxon_key, species_id, offset de fin,
+    occurrences, done) et avance leurs checkpoints ; renvoie le nb
+    d'occurrences écrites."""
+    db = SessionLocal()
+    try:
+        count = bulk_loader.upsert_occurrences(
+            db, (row for _, species_id, _, occs, _ in batch for row in _occurrence_rows(species_id, occs))
+        )
+        # Pages d'un même taxon dans l'ordre : la dernière fait foi
+        progress = {key: (end, done) for key, _, end, _, done in batch}
+        now = _now()
+        db.execute(update(models.ImportCheckpoint), [
+            {"job": job, "taxon_key": key, "occurrence_offset": end, "done": done, "updated_at": now}
+            for key, (end, done) in progress.items()
+        ])
+        db.commit()
+        return count
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------
+
+class _Import:
+    def __init__(self, client, job: str, concurrency: int, rate: float, max_occurrences: int):
+        self.client = client
+        self.job = job
+        self.max_occurrences = max_occurrences
+        self.sem = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rate)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(WRITE_BATCH, 2 * concurrency))
+        self.stats = {"species": 0, "occurrences": 0, "failed": 0}
+
+    async def get(self, url, params):
+        return await fetch_json(self.client, url, params=params, limiter=self.limiter)
+
+    async def fetch_taxon(self, taxon_key: int, species_id: int, offset: int) -> None:
+        """Toutes les pages d'occurrences du taxon à partir de offset."""
+        async with self.sem:
+            while True:
+                limit = min(OCCURRENCE_PAGE, self.max_occurrences - offset)
+                if limit <= 0:
+                    await self.queue.put((taxon_key, species_id, offset, [], True))
+                    break
+                params = {"taxonKey": taxon_key, "offset": offset, "limit": limit, "hasCoordinate": "true"}
+                try:
+                    data = await self.get(GBIF_OCCURRENCES, params)
+                except (httpx.HTTPError, ValueError) as e:
+                    # Checkpoint inchangé : le taxon sera repris au prochain import
+                    self.stats["failed"] += 1
+                    print(f"⚠️ Occurrences indisponibles pour le taxon {taxon_key} (offset {offset}): {e}")
+                    return
+                results = data.get("results", [])
+                offset += len(results)
+                done = data.get("endOfRecords", True) or not results or offset >= self.max_occurrences
+                await self.queue.put((taxon_key, species_id, offset, results, done))
+                if done:
+                    break
+        self.stats["species"] += 1
+
+    async def writer(self) -> None:
+        batch: list[tuple] = []
+
+        async def flush():
+            self.stats["occurrences"] += await asyncio.to_thread(_write_batch, self.job, batch)
+            batch.clear()
+
+        while True:
+            item = await self.queue.get()
+            if item is _DONE:
+                break
+            batch.append(item)
+            if len(batch) >= WRITE_BATCH:
+                await flush()
+        if batch:
+            await flush()
+
+    async def run_taxa(self, taxa: list[tuple[int, int, int]], writer: asyncio.Task) -> None:
+        """Traite un groupe de taxons ; s'arrête si le writer échoue."""
+        if not taxa:
+            return
+        fetch = asyncio.gather(*(self.fetch_taxon(*t) for t in taxa))
+        await asyncio.wait({fetch, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if writer.done():
+            fetch.cancel()
+            writer.result()  # relève l'erreur d'écriture
+            raise RuntimeError("Writer arrêté avant la fin de l'import")
+        await fetch
+
+    async def run(self, limit: int) -> None:
+        taxon_offset, pending = await asyncio.to_thread(_load_checkpoint, self.job)
+        if pending or taxon_offset:
+            print(f"↩️  Reprise : {len(pending)} taxons inachevés, liste à l'offset {taxon_offset}")
+
+        writer = asyncio.create_task(self.writer())
+        try:
+            # 1. Taxons interrompus lors d'un import précédent
+            await self.run_taxa(pending, writer)
+
+            # 2. Pages de taxons animaux (kingdom = Animalia) jusqu'à limit
+            while taxon_offset < limit:
+                params = {
+                    "kingdomKey": 1,  # Animalia
+                    "offset": taxon_offset,
+                    "limit": min(TAXON_PAGE, limit - taxon_offset),
+                }
+                data = await self.get(GBIF_SPECIES_SEARCH, params)
+                entries = data.get("results", [])
+                taxon_offset += len(entries)
+                taxa = await asyncio.to_thread(_register_taxa, self.job, entries, taxon_offset)
+                print(f"📌 Taxons {taxon_offset - len(entries)}–{taxon_offset} : {len(taxa)} nouveaux")
+                await self.run_taxa(taxa, writer)
+                if data.get("endOfRecords", True) or not entries:
+                    break
+        finally:
+            if not writer.done():
+                await self.queue.put(_DONE)
+            await writer
+
+
+async def import_species(
+    limit=500,
+    concurrency=CONCURRENCY,
+    rate=RATE,
+    max_occurrences=MAX_OCCURRENCES,
+    job=JOB,
+    restart=False,
+):
+    """Importe (ou poursuit l'import de) `limit` taxons au total pour ce job."""
+    print(f"🔎 Import GBIF – {limit} espèces, {max_occurrences} occurrences max par espèce "
+          f"(concurrence {concurrency}, {rate:g} req/s)...")
+    if restart:
+        await asyncio.to_thread(reset_checkpoints, job)
+
+    t0 = time.perf_counter()
+    run = _Import(get_async_client(), job, concurrency, rate, max_occurrences)
+    try:
+        await run.run(limit)
+    finally:
+        stats = run.stats
+        if stats["occurrences"] or stats["species"]:
+            data_version.bump()
+
+    elapsed = time.perf_counter() - t0
+    stats["seconds"] = round(elapsed, 2)
+    print(
+        f"🎉 Import terminé : {stats['species']} espèces, {stats['occurrences']} occurrences, "
+        f"{stats['failed']} échecs en {elapsed:.1f} s ({stats['occurrences'] / elapsed:,.0f} occurrences/s)"
+    )
+    return stats
+
+
+async def _main(limit: int, concurrency: int, restart: bool):
+    # Script autonome : les tables sources / import_checkpoints peuvent ne pas encore exister
+    await asyncio.to_thread(ensure_schema, engine)
+    try:
+        await import_species(limit, concurrency, restart=restart)
+    finally:
+        await close_http_client()
 
 
 if __name__ == "__main__":
-    asyncio.run(import_species())
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    limit = int(args[0]) if len(args) > 0 else 500
+    concurrency = int(args[1]) if len(args) > 1 else CONCURRENCY
+    asyncio.run(_main(limit, concurrency, "--restart" in sys.argv))
@@ -0,0 +1,70 @@
+# ecoatlas_api/http_cache.py
+"""
+GET conditionnels (ETag / If-None-Match) sur les routes de lecture.
+
+Le catalogue ne change qu'aux écritures qui appellent data_version.bump() :
+l'ETag d'une réponse est donc simplement la version des données. Un
+If-None-Match qui correspond reçoit un 304 sans toucher aux routes (donc
+sans requête SQL).
+"""
+
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from .services import data_version
+
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE_S", "60"))
+
+CACHED_PREFIXES = ("/species", "/occurrences", "/search")
+# Dépendent du cache Wikidata / du worker, pas seulement du catalogue
+UNCACHED_SUFFIXES = ("/bio", "/images")
+
+
+def is_cacheable(method: str, path: str) -> bool:
+    if method not in ("GET", "HEAD"):
+        return False
+    if not any(path == p or path.startswith(p + "/") for p in CACHED_PREFIXES):
+        return False
+    return not path.endswith(UNCACHED_SUFFIXES)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparaison faible (RFC 9110) : W/"x" == "x"."""
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag in tags
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_cacheable(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        # Relecture en base au plus toutes les POLL_INTERVAL secondes
+        if data_version.is_stale():
+            await run_in_threadpool(data_version.refresh)
+        etag = data_version.etag()
+        cache_headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", f"public, max-age={CACHE_MAX_AGE}".encode()),
+        ]
+
+        headers = dict(scope["headers"])
+        if_none_match = headers.get(b"if-none-match")
+        if if_none_match and etag_matches(if_none_match.decode("latin-1"), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = {**message, "headers": [*message.get("headers", []), *cache_headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
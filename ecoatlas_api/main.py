@@ -1,22 +1,78 @@
 # main.py
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
+import asyncio
+from contextlib import asynccontextmanager
 
+from . import startup_timing
+from .startup_timing import phase
 
-from .database import Base, engine
-from . import models
-from .routers import species, occurrences, search, admin
+with phase("import.fastapi"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse
+    from fastapi.staticfiles import StaticFiles
+    from pathlib import Path
+
+with phase("import.database"):
+    # IMPORTANT : models doit être importé pour que SQLAlchemy connaisse
+    # toutes les classes avant ensure_schema (create_all).
+    from .database import engine
+    from . import models
+    from .schema_upgrade import ensure_schema
+
+with phase("import.routers"):
+    from .http_cache import ConditionalGetMiddleware
+    from .routers import species, occurrences, search, export, admin
+    from .services.http_client import start_http_client, close_http_client
+    from .services.enrichment_worker import worker as enrichment_worker
+    from .services import warmup
+
+
+# ---------------------------------------------------------
+# Schéma : créé / mis à niveau au démarrage, sauf s'il est déjà à jour
+# (une seule requête dans ce cas, cf. schema_upgrade.ensure_schema)
+# ---------------------------------------------------------
+def _ensure_schema() -> None:
+    with phase("schema"):
+        added = ensure_schema(engine)
+    for column in added or []:
+        print(f"[INFO] Schema upgrade: added column {column}")
+
+
+async def _warmup_then_ready() -> None:
+    try:
+        await asyncio.to_thread(warmup.run_warmup)
+    finally:
+        startup_timing.mark_ready()
+        startup_timing.print_report("warm-up done")
 
 
 # ---------------------------------------------------------
-# Création des tables (si elles n'existent pas)
+# Cycle de vie : schéma, ressources partagées (client HTTP sortant,
+# worker d'enrichissement…), préchauffage optionnel (WARMUP=1)
 # ---------------------------------------------------------
-# IMPORTANT : il faut importer models AVANT ce create_all,
-# pour que SQLAlchemy connaisse toutes les classes.
-models  # juste pour être sûr qu'il est importé
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(_ensure_schema)
+    with phase("lifespan.resources"):
+        await start_http_client()
+        await enrichment_worker.start()
+
+    warmup_task = None
+    if warmup.ENABLED:
+        # En tâche de fond : le serveur écoute déjà, /ready répond 503
+        warmup_task = asyncio.create_task(_warmup_then_ready())
+    else:
+        startup_timing.mark_ready()
+    startup_timing.print_report("startup")
+
+    try:
+        yield
+    finally:
+        if warmup_task is not None and not warmup_task.done():
+            warmup_task.cancel()
+        await enrichment_worker.stop()
+        await close_http_client()
+
 
 # ---------------------------------------------------------
 # Initialisation de l'application FastAPI
@@ -29,8 +85,15 @@ app = FastAPI(
         "et les données issues de différentes sources (GBIF, etc.)."
     ),
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+# ---------------------------------------------------------
+# ETag / 304 sur les lectures du catalogue (cf. http_cache.py)
+# ---------------------------------------------------------
+# Ajouté avant CORS : CORS reste la couche externe (en-têtes sur les 304)
+app.add_middleware(ConditionalGetMiddleware)
+
 # ---------------------------------------------------------
 # CORS (pour autoriser l'app Expo / React Native à appeler l'API)
 # ---------------------------------------------------------
@@ -72,6 +135,7 @@ else:
 app.include_router(species.router)
 app.include_router(occurrences.router)
 app.include_router(search.router)
+app.include_router(export.router)
 app.include_router(admin.router)
 
 
@@ -86,6 +150,14 @@ def read_root():
     }
 
 
+@app.get("/ready", tags=["health"])
+def read_ready():
+    """200 une fois le démarrage (et le préchauffage éventuel) terminé."""
+    if not startup_timing.is_ready():
+        return JSONResponse({"status": "warming"}, status_code=503)
+    return {"status": "ready", "startup": startup_timing.report()}
+
+
 # ---------------------------------------------------------
 # Lancement en dev (python -m ecoatlas_api.main)
 # ---------------------------------------------------------
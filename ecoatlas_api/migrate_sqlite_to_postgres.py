@@ -1,14 +1,41 @@
 # ecoatlas_api/migrate_sqlite_to_postgres.py
+"""
+Migration SQLite -> PostgreSQL, en flux.
+
+- lecture par blocs de CHUNK lignes (stream_results + yield_per, triées
+  par id) : mémoire constante quelle que soit la taille des tables ;
+- écriture en COPY FROM STDIN (psycopg2), sinon en INSERT multi-lignes ;
+- un commit par bloc. Relancée après une interruption, la migration
+  reprend chaque table après le plus grand id déjà copié (les lignes
+  déjà présentes ne sont ni relues ni mises à jour) ;
+- les séquences PostgreSQL (SERIAL) sont recalées sur MAX(id) à la fin,
+  sinon les INSERT suivants entreraient en collision ;
+- débit (lignes/s) affiché par table.
+
+Les espèces en double par gbif_id (anciens imports) ne sont pas copiées,
+avec leurs occurrences et sources : l'index unique idx_species_gbif_id
+les refuserait. Même règle que la mise à niveau du schéma, la plus
+ancienne (MIN(id)) est gardée.
+
+Seules les colonnes présentes des deux côtés sont copiées (base SQLite
+antérieure à un ajout de colonne) ; grid_cell est recalculée si absente.
+
+    DATABASE_URL=postgresql://… python -m ecoatlas_api.migrate_sqlite_to_postgres
+"""
 
 import os
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import sessionmaker
+import time
 
-from .models import Base, Species, Occurrence, Source
+from sqlalchemy import create_engine, func, insert, inspect, select, text
+
+from .models import Species, Occurrence, Source, WikidataCache
+from .schema_upgrade import SPECIES_DUPES_SQL, ensure_schema
+from .services.bulk_loader import copy_rows
+from .services.spatial_index import grid_cell
 # Si tu ajoutes d'autres modèles plus tard, tu pourras les importer ici
 
 # SQLite local (déjà rempli par gbif_importer)
-SQLITE_URL = "sqlite:///./ecoatlas.db"
+SQLITE_URL = os.getenv("SQLITE_URL", "sqlite:///./ecoatlas.db")
 
 # Base distante (External Database URL Render)
 PG_URL = os.getenv("DATABASE_URL")
@@ -29,51 +56,137 @@ sqlite_engine = create_engine(
 )
 pg_engine = create_engine(PG_URL, future=True)
 
-SqliteSession = sessionmaker(bind=sqlite_engine)
-PgSession = sessionmaker(bind=pg_engine)
-
-
-def copy_table(src_session, dst_session, model):
-    """Copie générique d'une table SQLAlchemy par introspection."""
-    insp = inspect(model)
-    columns = [c.key for c in insp.columns]
-
-    rows = src_session.query(model).all()
-    print(f"  -> {model.__tablename__}: {len(rows)} lignes")
-
-    for row in rows:
-        data = {}
-        for col in columns:
-            data[col] = getattr(row, col)
-        # merge = upsert (insert ou update si déjà présent)
-        dst_session.merge(model(**data))
-
-    dst_session.commit()
+# IMPORTANT : respecter l'ordre des dépendances FK
+TABLES = [Species, Occurrence, Source, WikidataCache]
+
+CHUNK = 50_000
+
+# Colonne qui rattache chaque table à une espèce éventuellement en double
+SPECIES_REF = {Species: "id", Occurrence: "species_id", Source: "species_id"}
+
+
+def _uses_copy(engine) -> bool:
+    return engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+
+
+def _columns(model, src_insp) -> tuple[list[str], bool]:
+    """Colonnes à lire dans SQLite, et s'il faut calculer grid_cell."""
+    src_cols = {c["name"] for c in src_insp.get_columns(model.__tablename__)}
+    columns = [c.name for c in model.__table__.columns if c.name in src_cols]
+    add_grid_cell = model is Occurrence and "grid_cell" not in src_cols
+    return columns, add_grid_cell
+
+
+def _skip_species_dupes(model, src_insp):
+    """Filtre SQLite écartant les doublons gbif_id (None si sans objet)."""
+    ref = SPECIES_REF.get(model)
+    species_cols = {c["name"] for c in src_insp.get_columns(Species.__tablename__)}
+    if ref is None or "gbif_id" not in species_cols:
+        return None
+    return text(
+        f"{model.__tablename__}.{ref} NOT IN "
+        f"(SELECT dupe_id FROM ({SPECIES_DUPES_SQL}) AS dupes)"
+    )
+
+
+def _with_grid_cell(columns: list[str], rows):
+    lat, lng = columns.index("lat"), columns.index("lng")
+    for r in rows:
+        yield (*r, grid_cell(r[lat], r[lng]))
+
+
+def copy_table(model, src_insp) -> int:
+    """Copie les lignes de model d'id > MAX(id) côté PostgreSQL ; renvoie
+    le nombre de lignes copiées."""
+    table = model.__table__
+    name = table.name
+    if not src_insp.has_table(name):
+        print(f"  -> {name}: absente de SQLite, ignorée")
+        return 0
+
+    columns, add_grid_cell = _columns(model, src_insp)
+    dst_columns = columns + ["grid_cell"] if add_grid_cell else columns
+
+    with pg_engine.connect() as dst:
+        start_after = dst.execute(select(func.max(table.c.id))).scalar() or 0
+    where = [table.c.id > start_after]
+    skip_dupes = _skip_species_dupes(model, src_insp)
+    if skip_dupes is not None:
+        where.append(skip_dupes)
+
+    with sqlite_engine.connect() as src:
+        total = src.execute(select(func.count()).select_from(table).where(*where)).scalar()
+    if start_after:
+        print(f"  -> {name}: reprise après id {start_after}")
+    print(f"  -> {name}: {total} lignes")
+
+    stmt = (
+        select(*(table.c[c] for c in columns))
+        .where(*where)
+        .order_by(table.c.id)
+    )
+    use_copy = _uses_copy(pg_engine)
+    copied = 0
+    t0 = time.perf_counter()
+
+    with sqlite_engine.connect() as src, pg_engine.connect() as dst:
+        result = src.execution_options(stream_results=True, yield_per=CHUNK).execute(stmt)
+        for chunk in result.partitions():
+            rows = [tuple(r) for r in chunk]
+            if add_grid_cell:
+                rows = list(_with_grid_cell(columns, rows))
+            if use_copy:
+                copy_rows(dst, name, dst_columns, rows)
+            else:
+                dst.execute(insert(table), [dict(zip(dst_columns, r)) for r in rows])
+            dst.commit()
+
+            copied += len(rows)
+            elapsed = time.perf_counter() - t0
+            print(f"     {copied}/{total} ({copied / elapsed:,.0f} lignes/s)")
+
+    elapsed = time.perf_counter() - t0
+    if copied:
+        print(f"  ✔ {name}: {copied} lignes en {elapsed:.1f} s ({copied / elapsed:,.0f} lignes/s)")
+    return copied
+
+
+def reset_sequences() -> None:
+    """Recale les séquences des clés SERIAL sur MAX(id)."""
+    if pg_engine.dialect.name != "postgresql":
+        return
+    with pg_engine.begin() as conn:
+        for model in TABLES:
+            name = model.__tablename__
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {name}"
+            ))
 
 
 def main():
-    print("[STEP] Création des tables dans Postgres…")
-    Base.metadata.create_all(pg_engine)
-
-    src = SqliteSession()
-    dst = PgSession()
-
-    try:
-        # IMPORTANT : respecter l'ordre des dépendances FK
-        print("[STEP] Copie des espèces…")
-        copy_table(src, dst, Species)
-
-        print("[STEP] Copie des occurrences…")
-        copy_table(src, dst, Occurrence)
-
-        print("[STEP] Copie des sources…")
-        copy_table(src, dst, Source)
-
-        print("🎉 Migration terminée avec succès !")
-
-    finally:
-        src.close()
-        dst.close()
+    print("[STEP] Création / mise à niveau des tables dans Postgres…")
+    ensure_schema(pg_engine)
+
+    src_insp = inspect(sqlite_engine)
+    if _skip_species_dupes(Species, src_insp) is not None:
+        with sqlite_engine.connect() as src:
+            dupes = src.exec_driver_sql(f"SELECT COUNT(*) FROM ({SPECIES_DUPES_SQL}) AS dupes").scalar()
+        if dupes:
+            print(f"[WARN] {dupes} espèces en double (gbif_id) ignorées, avec leurs occurrences et sources")
+
+    t0 = time.perf_counter()
+    copied = 0
+    for model in TABLES:
+        print(f"[STEP] Copie de {model.__tablename__}…")
+        copied += copy_table(model, src_insp)
+
+    print("[STEP] Recalage des séquences…")
+    reset_sequences()
+
+    elapsed = time.perf_counter() - t0
+    print(f"🎉 Migration terminée avec succès : {copied} lignes en {elapsed:.1f} s "
+          f"({copied / max(elapsed, 1e-9):,.0f} lignes/s)")
 
 
 if __name__ == "__main__":
@@ -7,14 +7,18 @@ Species + Occurrence with Wikidata enrichment.
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     Float,
     Text,
+    Boolean,
+    DateTime,
     ForeignKey,
     Index,
 )
 from sqlalchemy.orm import relationship
 from .database import Base
+from .services.spatial_index import grid_cell_default
 
 
 class Species(Base):
@@ -41,11 +45,19 @@ class Species(Base):
     # Photo (Wikimedia URL)
     photo_url = Column(Text, nullable=True)
 
+    # Rechargement incrémental (cf. services/species_loader.py) :
+    # identifiant de l'enregistrement dans le fichier source + hash de son contenu
+    source_key = Column(String(255), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+
     occurrences = relationship("Occurrence", back_populates="species")
 
     __table_args__ = (
         Index("idx_species_common", "common_name"),
         Index("idx_species_scientific", "scientific_name"),
+        Index("idx_species_source_key", "source_key", unique=True),
+        # Clé des upserts de gbif_importer (NULL pour les espèces hors GBIF)
+        Index("idx_species_gbif_id", "gbif_id", unique=True),
     )
 
 
@@ -58,15 +70,107 @@ class Occurrence(Base):
     lat = Column(Float, nullable=False)
     lng = Column(Float, nullable=False)
 
+    # Cellule de la grille spatiale (cf. services/spatial_index.py)
+    grid_cell = Column(Integer, nullable=True, default=grid_cell_default)
+
     start_year = Column(Integer, nullable=True)
     end_year = Column(Integer, nullable=True)
 
     source = Column(String(50), default="MANUAL")
 
+    # Clé de l'occurrence chez GBIF (upserts de gbif_importer)
+    gbif_key = Column(BigInteger, nullable=True)
+
     species = relationship("Species", back_populates="occurrences")
 
     __table_args__ = (
         Index("idx_occ_species", "species_id"),
         Index("idx_occ_lat_lng", "lat", "lng"),
+        Index("idx_occ_grid_cell", "grid_cell"),
         Index("idx_occ_year", "start_year", "end_year"),
+        Index("idx_occ_gbif_key", "gbif_key", unique=True),
+    )
+
+
+class Source(Base):
+    """Donnée brute d'une source externe (GBIF…) rattachée à une espèce."""
+
+    __tablename__ = "sources"
+
+    id = Column(Integer, primary_key=True, index=True)
+    species_id = Column(Integer, ForeignKey("species.id", ondelete="CASCADE"))
+
+    source_name = Column(String(50), nullable=False)
+    field_name = Column(String(100), nullable=True)
+    value_raw = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("idx_sources_species", "species_id"),
+    )
+
+
+class WikidataCache(Base):
+    """Cache persistant des réponses Wikidata (cf. services/wikidata_cache.py)."""
+
+    __tablename__ = "wikidata_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scientific_name = Column(String(255), nullable=False, unique=True)
+    qid = Column(String(32), nullable=True)
+
+    # "ok" (payload = JSON parsé), "missing" (introuvable) ou "error" (échec réseau)
+    status = Column(String(16), nullable=False, default="ok")
+    payload = Column(Text, nullable=True)
+
+    fetched_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_wikidata_cache_qid", "qid"),
     )
+
+
+class DataVersion(Base):
+    """Ligne unique (id=1) : jetons changés à chaque écriture du catalogue
+    (cf. services/data_version.py)."""
+
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    # Change à toute écriture (ETag des réponses)
+    version = Column(String(32), nullable=False)
+    # Change seulement si espèces/occurrences changent (index en mémoire)
+    catalog_version = Column(String(32), nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class SchemaInfo(Base):
+    """Ligne unique (id=1) : empreinte du schéma déjà appliqué
+    (cf. schema_upgrade.ensure_schema)."""
+
+    __tablename__ = "schema_info"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class ImportCheckpoint(Base):
+    """Avancement d'un import GBIF, pour reprendre là où il s'est arrêté
+    (cf. gbif_importer).
+
+    - ligne du job (taxon_key = 0) : taxon_offset = position de la
+      prochaine page de taxons à lister ;
+    - une ligne par taxon enregistré : species_id créé, occurrence_offset
+      = nb d'occurrences déjà écrites, done une fois le taxon terminé.
+    """
+
+    __tablename__ = "import_checkpoints"
+
+    job = Column(String(64), primary_key=True)
+    taxon_key = Column(Integer, primary_key=True, autoincrement=False)
+    species_id = Column(Integer, ForeignKey("species.id", ondelete="CASCADE"), nullable=True)
+    taxon_offset = Column(Integer, nullable=True)
+    occurrence_offset = Column(Integer, nullable=False, default=0)
+    done = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, nullable=False)
@@ -0,0 +1,65 @@
+# ecoatlas_api/pagination.py
+"""
+Pagination par curseur (keyset) pour les listes d'espèces.
+
+Le curseur est opaque pour le client : base64 d'un petit JSON
+{"k": <type de liste>, "v": <clé de tri de la dernière ligne>}.
+"""
+
+import base64
+import json
+
+# Forme de la clé de tri par type de liste (None = valeur NULL admise)
+CURSOR_KEYS = {
+    # (common_name, id)
+    "species": ((str, None), (int,)),
+    # (-score, longueur du nom, common_name, id) : cf. SearchIndex.ranked
+    "search": ((int,), (int,), (str, None), (int,)),
+}
+
+
+def _valid_key(kind: str, key: list) -> bool:
+    shape = CURSOR_KEYS.get(kind)
+    if shape is None:
+        return True
+    if len(key) != len(shape):
+        return False
+    for value, allowed in zip(key, shape):
+        if value is None:
+            if None not in allowed:
+                return False
+        # bool est un int pour Python, pas pour une clé de tri
+        elif isinstance(value, bool) or not isinstance(value, tuple(t for t in allowed if t)):
+            return False
+    return True
+
+
+def encode_cursor(kind: str, key) -> str:
+    raw = json.dumps({"k": kind, "v": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(kind: str, cursor: str) -> tuple | None:
+    """Renvoie la clé de tri, ou None pour un curseur vide (première page).
+
+    Lève ValueError si le curseur est invalide, d'un autre type de liste
+    ou si sa clé n'a pas la forme attendue (CURSOR_KEYS).
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if data["k"] != kind or not isinstance(data["v"], list) or not _valid_key(kind, data["v"]):
+            raise ValueError
+        return tuple(data["v"])
+    except Exception:
+        raise ValueError("Curseur invalide")
+
+
+def paginate(rows: list, limit: int, kind: str, key) -> tuple[list, str | None]:
+    """rows a été chargé avec limit + 1 lignes : renvoie (page, next_cursor)."""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(kind, key(page[-1]))
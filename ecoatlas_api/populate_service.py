@@ -2,24 +2,19 @@
 """
 Service de remplissage de la base Species + Occurrence
 → utilisé par une route admin (utile sur Render free, sans shell).
+
+species_base.json n'est lu qu'à l'appel (snapshot binaire si présent,
+cf. services/seed_snapshot.py), jamais à l'import.
 """
 
-import json
 import random
-from pathlib import Path
 from sqlalchemy.orm import Session
 
 from .database import SessionLocal
 from . import models
-
-
-# -----------------------------------------------------
-# Charger les 500 espèces depuis species_base.json
-# -----------------------------------------------------
-DATA_PATH = Path(__file__).resolve().parent / "data" / "species_base.json"
-
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    SPECIES_DATA = json.load(f)
+from .services import bulk_loader, data_version
+from .services.seed_snapshot import load_seed
+from .services.species_loader import record_key
 
 
 # -----------------------------------------------------
@@ -51,61 +46,55 @@ def infer_life_zone(common_name: str | None, biome: str | None) -> str | None:
 
 def reset_tables(db: Session) -> None:
     """Supprime toutes les occurrences + espèces."""
-    db.query(models.Occurrence).delete()
-    db.query(models.Species).delete()
-    db.commit()
+    bulk_loader.clear_catalog(db)
 
 
 def populate_species_database() -> int:
     """
     Vide complètement les tables species + occurrences,
-    puis insère les 500 espèces de species_base.json.
+    puis insère les 500 espèces de species_base.json
+    (insertions groupées, un seul commit).
     Renvoie le nombre d'espèces créées.
     """
     db = SessionLocal()
-    created = 0
 
     try:
         reset_tables(db)
 
-        for sp_raw in SPECIES_DATA:
-            common = sp_raw.get("common_name")
-            sci = sp_raw.get("scientific_name")
-            biome = sp_raw.get("biome")
-            life_zone = infer_life_zone(common, biome)
-
-            # Création de l'espèce (on laisse population, poids, tailles à None pour l'instant)
-            species = models.Species(
-                gbif_id=None,
-                common_name=common,
-                scientific_name=sci,
-                life_zone=life_zone,
-                biome=biome,
+        records = load_seed()
+
+        # On laisse population, poids, tailles à None pour l'instant
+        ids = bulk_loader.insert_species(
+            db,
+            [
+                {
+                    "gbif_id": None,
+                    "common_name": rec.common_name,
+                    "scientific_name": rec.scientific_name,
+                    "life_zone": infer_life_zone(rec.common_name, rec.biome),
+                    "biome": rec.biome,
+                    # Permet ensuite un rechargement incrémental (sync_species_database)
+                    "source_key": record_key(rec),
+                    "content_hash": rec.content_hash,
+                }
+                for rec in records
+            ],
+        )
+
+        # Occurrences
+        with bulk_loader.deferred_indexes(db, models.Occurrence):
+            bulk_loader.insert_occurrences(
+                db,
+                (
+                    (species_id, lat, lng, *generate_years(f"{species_id}:{idx}"), "MANUAL")
+                    for species_id, rec in zip(ids, records)
+                    for idx, (lat, lng) in enumerate(zip(rec.lats, rec.lngs))
+                ),
             )
-            db.add(species)
-            db.commit()
-            db.refresh(species)
-
-            # Occurrences
-            for idx, o in enumerate(sp_raw.get("occurrences", [])):
-                lat = float(o["lat"])
-                lng = float(o["lng"])
-                start, end = generate_years(f"{species.id}:{idx}")
-
-                occ = models.Occurrence(
-                    species_id=species.id,
-                    lat=lat,
-                    lng=lng,
-                    start_year=start,
-                    end_year=end,
-                    source="MANUAL",
-                )
-                db.add(occ)
-
-            db.commit()
-            created += 1
-
-        return created
+        db.commit()
 
     finally:
         db.close()
+
+    data_version.bump()
+    return len(ids)
@@ -3,6 +3,7 @@
 from . import species
 from . import occurrences
 from . import search
+from . import export
 from . import admin
 
-__all__ = ["species", "occurrences", "search", "admin"]
+__all__ = ["species", "occurrences", "search", "export", "admin"]
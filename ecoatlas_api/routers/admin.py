@@ -8,7 +8,9 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from ..database import engine
 from ..database import Base
-from ..services.species_loader import reload_species_database
+from ..services.enrichment_job import enrich_all_species
+from ..services.enrichment_worker import worker as enrichment_worker
+from ..services import data_version
 
 router = APIRouter(
     prefix="/admin",
@@ -29,6 +31,7 @@ def reset_database(token: str = Query(...)):
     try:
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
+        data_version.bump()
         return {"status": "ok", "message": "Database reset done"}
     except SQLAlchemyError as e:
         raise HTTPException(500, f"Reset failed: {str(e)}")
@@ -38,12 +41,54 @@ def reset_database(token: str = Query(...)):
 # RELOAD DATABASE WITH SPECIES JSON
 # --------------------------------------------------------
 @router.post("/reload")
-def reload_database(token: str = Query(...)):
+def reload_database(
+    token: str = Query(...),
+    full: bool = Query(False, description="Tout vider et recharger (ids régénérés, enrichissement perdu)"),
+):
     if token != SECRET:
         raise HTTPException(403, "Invalid token")
 
+    # Import différé : chargeur + snapshot ne servent qu'ici (démarrage à froid)
+    from ..services.species_loader import reload_species_database, sync_species_database
+
     try:
-        inserted = reload_species_database()
-        return {"status": "ok", "inserted": inserted}
+        if full:
+            inserted = reload_species_database()
+            return {"status": "ok", "inserted": inserted}
+        # Par défaut : seules les espèces ajoutées / modifiées / supprimées sont touchées
+        return {"status": "ok", **sync_species_database()}
+    except ValueError as e:
+        raise HTTPException(400, f"Reload failed: {str(e)}")
     except SQLAlchemyError as e:
         raise HTTPException(500, f"Reload failed: {str(e)}")
+
+
+# --------------------------------------------------------
+# BULK WIKIDATA ENRICHMENT
+# --------------------------------------------------------
+@router.post("/enrich")
+async def enrich_database(
+    token: str = Query(...),
+    overwrite: bool = Query(False),
+):
+    if token != SECRET:
+        raise HTTPException(403, "Invalid token")
+
+    # Client HTTP async de l'app ; la base est lue / écrite dans des threads.
+    # Les lots Wikidata en échec sont sautés (cf. failed_batches).
+    try:
+        stats = await enrich_all_species(overwrite=overwrite)
+        return {"status": "ok", **stats}
+    except SQLAlchemyError as e:
+        raise HTTPException(500, f"Enrichment failed: {str(e)}")
+
+
+# --------------------------------------------------------
+# BACKGROUND ENRICHMENT WORKER STATS
+# --------------------------------------------------------
+@router.get("/enrichment/stats")
+def enrichment_stats(token: str = Query(...)):
+    if token != SECRET:
+        raise HTTPException(403, "Invalid token")
+
+    return enrichment_worker.stats()
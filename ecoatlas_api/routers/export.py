@@ -0,0 +1,135 @@
+# ecoatlas_api/routers/export.py
+"""
+Export Router – dumps complets des occurrences en flux
+(GeoJSON FeatureCollection ou NDJSON).
+
+La réponse est produite au fil d'un curseur serveur (crud.iter_occurrence_export) :
+la mémoire reste constante, même pour des millions de lignes.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from .. import crud
+from ..database import SessionLocal
+from ..fast_json import dumps
+from ..services.spatial_index import split_bbox
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"],
+)
+
+
+# ---------------------------------------------------------
+# Filtres communs
+# ---------------------------------------------------------
+
+def _export_filters(species_id, from_year, to_year, source, west, south, east, north) -> dict:
+    bbox = (west, south, east, north)
+    if any(v is not None for v in bbox) and any(v is None for v in bbox):
+        raise HTTPException(400, "bbox : west, south, east et north sont requis ensemble")
+    if south is not None and south > north:
+        raise HTTPException(400, "south doit être <= north")
+
+    return {
+        "species_id": species_id,
+        "from_year": from_year,
+        "to_year": to_year,
+        "source": source,
+        # west > east : bbox à cheval sur l'antiméridien
+        "boxes": split_bbox(west, south, east, north) if west is not None else None,
+    }
+
+
+def _stream_chunks(filters: dict):
+    """Lots de lignes lus avec une session propre au flux : celle de la
+    requête (get_db) peut être fermée avant la fin de l'envoi."""
+    db = SessionLocal()
+    try:
+        yield from crud.iter_occurrence_export(db, **filters)
+    finally:
+        db.close()
+
+
+def _feature(row) -> dict:
+    occ_id, species_id, scientific_name, lat, lng, start_year, end_year, source = row
+    return {
+        "type": "Feature",
+        "id": occ_id,
+        "geometry": {"type": "Point", "coordinates": [lng, lat]},
+        "properties": {
+            "species_id": species_id,
+            "scientific_name": scientific_name,
+            "start_year": start_year,
+            "end_year": end_year,
+            "source": source,
+        },
+    }
+
+
+def _geojson_stream(filters: dict):
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    for chunk in _stream_chunks(filters):
+        body = b",".join(dumps(_feature(r)) for r in chunk)
+        yield body if first else b"," + body
+        first = False
+    yield b"]}\n"
+
+
+def _ndjson_stream(filters: dict):
+    for chunk in _stream_chunks(filters):
+        yield b"".join(dumps(dict(zip(crud.EXPORT_FIELDS, r))) + b"\n" for r in chunk)
+
+
+# ---------------------------------------------------------
+# Routes
+# ---------------------------------------------------------
+
+@router.get(
+    "/occurrences.geojson",
+    summary="Export GeoJSON (FeatureCollection) des occurrences, en flux",
+    response_class=StreamingResponse,
+)
+def export_geojson(
+    species_id: Optional[int] = Query(None),
+    from_year: Optional[int] = Query(None),
+    to_year: Optional[int] = Query(None),
+    source: Optional[str] = Query(None),
+    west: Optional[float] = Query(None, ge=-180, le=180),
+    south: Optional[float] = Query(None, ge=-90, le=90),
+    east: Optional[float] = Query(None, ge=-180, le=180),
+    north: Optional[float] = Query(None, ge=-90, le=90),
+):
+    filters = _export_filters(species_id, from_year, to_year, source, west, south, east, north)
+    return StreamingResponse(
+        _geojson_stream(filters),
+        media_type="application/geo+json",
+        headers={"Content-Disposition": 'attachment; filename="occurrences.geojson"'},
+    )
+
+
+@router.get(
+    "/occurrences.ndjson",
+    summary="Export NDJSON (une occurrence par ligne), en flux",
+    response_class=StreamingResponse,
+)
+def export_ndjson(
+    species_id: Optional[int] = Query(None),
+    from_year: Optional[int] = Query(None),
+    to_year: Optional[int] = Query(None),
+    source: Optional[str] = Query(None),
+    west: Optional[float] = Query(None, ge=-180, le=180),
+    south: Optional[float] = Query(None, ge=-90, le=90),
+    east: Optional[float] = Query(None, ge=-180, le=180),
+    north: Optional[float] = Query(None, ge=-90, le=90),
+):
+    filters = _export_filters(species_id, from_year, to_year, source, west, south, east, north)
+    return StreamingResponse(
+        _ndjson_stream(filters),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="occurrences.ndjson"'},
+    )
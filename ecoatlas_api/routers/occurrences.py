@@ -3,12 +3,16 @@
 Occurrences Router – PRO VERSION
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from ..database import get_db
 from .. import crud, schemas
+from ..fast_json import json_response, rows_to_dicts
+from ..services import tile_service
+from ..services.occurrence_packing import PACKED_FIELDS, PACKED_MEDIA_TYPE, pack_occurrences
+from ..services.spatial_index import PolygonFilter
 
 router = APIRouter(
     prefix="/occurrences",
@@ -16,23 +20,137 @@ router = APIRouter(
 )
 
 
+@router.get(
+    "/tiles/{z}/{x}/{y}",
+    response_model=schemas.OccurrenceTile,
+    summary="Tuile d'occurrences agrégées (clusters)",
+)
+def get_occurrence_tile(
+    z: int,
+    x: int,
+    y: int,
+    species_id: Optional[int] = Query(None),
+    from_year: Optional[int] = Query(None),
+    to_year: Optional[int] = Query(None),
+    biome: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    if not tile_service.is_valid_tile(z, x, y):
+        raise HTTPException(400, f"Tuile invalide : {z}/{x}/{y}")
+
+    return json_response(tile_service.get_tile(
+        db,
+        z=z,
+        x=x,
+        y=y,
+        species_id=species_id,
+        from_year=from_year,
+        to_year=to_year,
+        biome=biome,
+    ))
+
+
+@router.get(
+    "/bbox",
+    response_model=schemas.SpatialQueryOut,
+    summary="Occurrences et espèces dans une bbox (viewport)",
+)
+def get_occurrences_in_bbox(
+    west: float = Query(..., ge=-180, le=180),
+    south: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    from_year: Optional[int] = Query(None),
+    to_year: Optional[int] = Query(None),
+    limit: int = Query(1000, ge=0, le=10000),
+    db: Session = Depends(get_db),
+):
+    # west > east est accepté : la bbox traverse l'antiméridien
+    if south > north:
+        raise HTTPException(400, "south doit être <= north")
+
+    total, species_ids, occ = crud.get_occurrences_in_bbox(
+        db,
+        west=west,
+        south=south,
+        east=east,
+        north=north,
+        from_year=from_year,
+        to_year=to_year,
+        limit=limit,
+    )
+    return schemas.SpatialQueryOut(
+        total=total,
+        truncated=total > len(occ),
+        species_ids=species_ids,
+        occurrences=occ,
+    )
+
+
+@router.post(
+    "/within",
+    response_model=schemas.SpatialQueryOut,
+    summary="Occurrences et espèces dans un polygone GeoJSON",
+)
+def get_occurrences_within(
+    geometry: Dict[str, Any] = Body(..., description="Polygon, MultiPolygon ou Feature GeoJSON"),
+    from_year: Optional[int] = Query(None),
+    to_year: Optional[int] = Query(None),
+    limit: int = Query(1000, ge=0, le=10000),
+    db: Session = Depends(get_db),
+):
+    try:
+        polygon = PolygonFilter.from_geojson(geometry)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    total, species_ids, occ = crud.get_occurrences_in_polygon(
+        db,
+        polygon,
+        from_year=from_year,
+        to_year=to_year,
+        limit=limit,
+    )
+    return schemas.SpatialQueryOut(
+        total=total,
+        truncated=total > len(occ),
+        species_ids=species_ids,
+        occurrences=occ,
+    )
+
+
 @router.get(
     "/{species_id}",
     response_model=List[schemas.OccurrenceOut],
     summary="Occurrences filtrées",
+    responses={
+        200: {
+            "content": {PACKED_MEDIA_TYPE: {}},
+            "description": (
+                "JSON par défaut ; format=packed : binaire little-endian "
+                "(cf. services/occurrence_packing.py)."
+            ),
+        }
+    },
 )
 def get_occurrences(
     species_id: int,
     from_year: Optional[int] = Query(None),
     to_year: Optional[int] = Query(None),
     source: Optional[str] = Query(None),
+    format: Literal["json", "packed"] = Query("json"),
+    delta: bool = Query(False, description="format=packed : années delta-encodées"),
     db: Session = Depends(get_db),
 ):
-    occ = crud.get_occurrences_for_species(
+    packed = format == "packed"
+    rows = crud.get_occurrence_rows_for_species(
         db,
         species_id=species_id,
         from_year=from_year,
         to_year=to_year,
         source=source,
+        fields=PACKED_FIELDS if packed else crud.OCCURRENCE_FIELDS,
     )
-    return occ
+    if packed:
+        return Response(content=pack_occurrences(rows, delta=delta), media_type=PACKED_MEDIA_TYPE)
+    return json_response(rows_to_dicts(rows, crud.OCCURRENCE_FIELDS))
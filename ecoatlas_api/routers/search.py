@@ -3,12 +3,15 @@
 Recherche intelligente d'espèces
 """
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
 from ..database import get_db
 from .. import crud, schemas
+from ..fast_json import json_response, rows_to_dicts
+from ..pagination import decode_cursor, paginate
+from ..services.suggest_index import get_suggest_index
 
 router = APIRouter(
     prefix="/search",
@@ -18,12 +21,48 @@ router = APIRouter(
 
 @router.get(
     "/species",
-    response_model=List[schemas.SpeciesSummary],
+    response_model=Union[List[schemas.SpeciesSummary], schemas.SpeciesPage],
 )
 def search_species(
     q: str = Query(..., min_length=1),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(
+        None,
+        description=(
+            "Pagination par curseur : vide pour la première page, puis "
+            "next_cursor. Renvoie alors {items, next_cursor}."
+        ),
+    ),
     db: Session = Depends(get_db),
 ):
-    return crud.search_species(db, query_text=q, limit=limit, offset=offset)
+    try:
+        after = decode_cursor("search", cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    rows = crud.search_species(
+        db, query_text=q, limit=limit + 1, offset=offset, after=after
+    )
+    page, next_cursor = paginate(rows, limit, "search", key=lambda row: row[0])
+    items = rows_to_dicts((sp for _, sp in page), crud.SPECIES_SUMMARY_FIELDS)
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if cursor is not None:
+        return json_response({"items": items, "next_cursor": next_cursor}, headers)
+    return json_response(items, headers)
+
+
+@router.get(
+    "/suggest",
+    response_model=List[schemas.Suggestion],
+    summary="Autocomplétion (index en mémoire, sans requête SQL)",
+)
+def suggest_species(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+):
+    return [
+        schemas.Suggestion(id=sid, common_name=common, scientific_name=scientific)
+        for sid, common, scientific in get_suggest_index().suggest(prefix, limit)
+    ]
@@ -1,17 +1,23 @@
 # ecoatlas_api/routers/species.py
 """
 Species Router – PRO VERSION
-Espèces + détails + bio externe Wikidata + images.
+Espèces + détails + bio (base + cache Wikidata) + images.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 
 from ..database import get_db
 from .. import crud, schemas, models
-from ..services.wikidata_service import fetch_wikidata
+from ..fast_json import json_response, rows_to_dicts
+from ..pagination import decode_cursor, paginate
+from ..bio_service import build_species_bio, needs_refresh
+from ..services.enrichment_worker import worker as enrichment_worker
+from ..services.wikidata_cache import peek_wikidata
 from ..services.wikimedia_service import wikimedia_image_url
+from ..services.timeline_service import get_timeline
 
 router = APIRouter(
     prefix="/species",
@@ -19,13 +25,35 @@ router = APIRouter(
 )
 
 
+# ---------------------------------------------------------
+# FIELDS / INCLUDE
+# ---------------------------------------------------------
+
+INCLUDES = ("occurrences", "bio")
+
+
+def _parse_list(value: str | None, allowed, param: str) -> list[str]:
+    """'a,b' -> ['a', 'b'] en vérifiant chaque valeur (400 sinon)."""
+    if not value:
+        return []
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [v for v in items if v not in allowed]
+    if unknown:
+        raise HTTPException(
+            400,
+            f"{param} inconnu(s) : {', '.join(unknown)} "
+            f"(valeurs possibles : {', '.join(allowed)})",
+        )
+    return list(dict.fromkeys(items))
+
+
 # ---------------------------------------------------------
 # LIST
 # ---------------------------------------------------------
 
 @router.get(
     "",
-    response_model=List[schemas.SpeciesSummary],
+    response_model=Union[List[schemas.SpeciesSummary], schemas.SpeciesPage],
     summary="Lister les espèces (pro)",
 )
 def list_species(
@@ -35,19 +63,67 @@ def list_species(
     search: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(
+        None,
+        description=(
+            "Pagination par curseur : vide pour la première page, puis "
+            "next_cursor. Renvoie alors {items, next_cursor}."
+        ),
+    ),
+    fields: Optional[str] = Query(
+        None,
+        description="Champs à renvoyer, séparés par des virgules (ex: id,common_name).",
+    ),
     db: Session = Depends(get_db),
 ):
-    species = crud.get_species_list(
+    try:
+        after = decode_cursor("species", cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    field_list = _parse_list(fields, crud.SPECIES_SUMMARY_FIELDS, "fields")
+
+    rows = crud.get_species_list(
         db,
         year=year,
         life_zone=life_zone,
         biome=biome,
         search=search,
-        limit=limit,
+        limit=limit + 1,
         offset=offset,
+        after=after,
+        fields=field_list or crud.SPECIES_SUMMARY_FIELDS,
+    )
+    species, next_cursor = paginate(
+        rows, limit, "species", key=lambda sp: (sp.common_name, sp.id)
     )
+    # Lignes -> JSON directement (mêmes clés que SpeciesSummary)
+    items = rows_to_dicts(species, crud.species_output_fields(field_list or crud.SPECIES_SUMMARY_FIELDS))
 
-    return species
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if cursor is not None:
+        return json_response({"items": items, "next_cursor": next_cursor}, headers)
+    return json_response(items, headers)
+
+
+# ---------------------------------------------------------
+# TIMELINE (frise du slider)
+# ---------------------------------------------------------
+
+@router.get(
+    "/timeline",
+    response_model=schemas.Timeline,
+    summary="Nombre d'espèces / occurrences actives par année",
+)
+def species_timeline(
+    from_year: Optional[int] = Query(None),
+    to_year: Optional[int] = Query(None),
+    group_by: Optional[Literal["biome", "life_zone"]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    try:
+        return get_timeline(db, from_year=from_year, to_year=to_year, group_by=group_by)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
 
 # ---------------------------------------------------------
@@ -57,57 +133,81 @@ def list_species(
 @router.get(
     "/{species_id}",
     response_model=schemas.SpeciesDetail,
+    response_model_exclude_unset=True,
     summary="Détail complet d'une espèce",
 )
 def get_species_detail(
     species_id: int,
-    include: str | None = Query(None),
+    fields: Optional[str] = Query(
+        None,
+        description="Colonnes à renvoyer, séparées par des virgules (id toujours inclus).",
+    ),
+    include: Optional[str] = Query(
+        None,
+        description=(
+            "occurrences,bio. Sans fields ni include : payload complet "
+            "(toutes les colonnes + toutes les occurrences)."
+        ),
+    ),
+    occurrences_limit: int = Query(1000, ge=1, le=10000),
     db: Session = Depends(get_db),
 ):
-    sp = crud.get_species_by_id(db, species_id)
+    field_list = _parse_list(fields, crud.SPECIES_FIELDS, "fields")
+    includes = _parse_list(include, INCLUDES, "include")
+
+    # Compatibilité : sans paramètre, on garde l'ancien payload complet
+    if fields is None and include is None:
+        sp = crud.get_species_by_id(db, species_id)
+        if not sp:
+            raise HTTPException(404, f"Espèce id={species_id} inconnue")
+        return sp
+
+    columns = field_list or list(crud.SPECIES_SUMMARY_FIELDS)
+    if "bio" in includes:
+        columns += [f for f in crud.SPECIES_BIO_FIELDS if f not in columns]
+
+    sp = crud.get_species_by_id(db, species_id, fields=columns, occurrences=False)
     if not sp:
         raise HTTPException(404, f"Espèce id={species_id} inconnue")
 
-    return sp
+    payload = {"id": sp.id, **{f: getattr(sp, f) for f in columns}}
+
+    if "occurrences" in includes:
+        occ = crud.get_occurrences_for_species(db, species_id, limit=occurrences_limit + 1)
+        payload["occurrences"] = occ[:occurrences_limit]
+        payload["occurrences_truncated"] = len(occ) > occurrences_limit
+
+    return schemas.SpeciesDetail(**payload)
 
 
 # ---------------------------------------------------------
 # BIO WIKIDATA
 # ---------------------------------------------------------
 
+def _get_species_and_release(db: Session, species_id: int):
+    """Charge l'espèce puis rend la connexion au pool avant l'appel
+    Wikidata (l'objet détaché garde ses colonnes déjà chargées)."""
+    sp = db.get(models.Species, species_id)
+    db.close()
+    return sp
+
+
 @router.get(
     "/{species_id}/bio",
     response_model=schemas.SpeciesBio,
-    summary="Informations biologiques externes via Wikidata",
+    summary="Informations biologiques (base + cache Wikidata)",
 )
-def get_species_bio(species_id: int, db: Session = Depends(get_db)):
-    sp = crud.get_species_by_id(db, species_id)
+async def get_species_bio(species_id: int, db: Session = Depends(get_db)):
+    sp = await run_in_threadpool(_get_species_and_release, db, species_id)
     if not sp:
         raise HTTPException(404, "Espèce inconnue")
 
-    data = fetch_wikidata(sp.scientific_name)
-    if not data:
-        raise HTTPException(404, "Données Wikidata introuvables")
-
-    # Convertir image
-    img_url = None
-    if data.get("image_filename"):
-        img_url = wikimedia_image_url(data["image_filename"])
-
-    return schemas.SpeciesBio(
-        id=sp.id,
-        common_name=sp.common_name,
-        scientific_name=sp.scientific_name,
-        diet=data.get("diet"),
-        lifespan_years=data.get("lifespan_years"),
-        habitat=data.get("habitat"),
-        speed_kmh=data.get("speed_kmh"),
-        iucn_status=data.get("iucn_status"),
-        size_adult_cm=data.get("size_adult_cm"),
-        weight_adult_kg=data.get("weight_adult_kg"),
-        range_description=data.get("range_description"),
-        photo_url=img_url,
-    )
+    # Jamais d'attente sur Wikidata : le worker complète la base en tâche de fond
+    data = await peek_wikidata(sp.scientific_name)
+    if needs_refresh(sp, data):
+        enrichment_worker.enqueue(sp.id, sp.scientific_name)
+
+    return build_species_bio(sp, data)
 
 
 # ---------------------------------------------------------
@@ -118,16 +218,17 @@ def get_species_bio(species_id: int, db: Session = Depends(get_db)):
     "/{species_id}/images",
     summary="Récupère une image HD via Wikidata/Wikimedia",
 )
-def get_species_image(species_id: int, db: Session = Depends(get_db)):
-    sp = crud.get_species_by_id(db, species_id)
+async def get_species_image(species_id: int, db: Session = Depends(get_db)):
+    sp = await run_in_threadpool(_get_species_and_release, db, species_id)
     if not sp:
         raise HTTPException(404)
 
-    data = fetch_wikidata(sp.scientific_name)
-    if not data:
-        return {"photo_url": None}
+    if sp.photo_url:
+        return {"photo_url": sp.photo_url}
 
-    if not data.get("image_filename"):
+    data = await peek_wikidata(sp.scientific_name)
+    enrichment_worker.enqueue(sp.id, sp.scientific_name)
+    if not data:
         return {"photo_url": None}
 
-    return {"photo_url": wikimedia_image_url(data["image_filename"])}
+    return {"photo_url": wikimedia_image_url(data.get("image_filename")) or data.get("commons_thumbnail")}
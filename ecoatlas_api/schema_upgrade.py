@@ -0,0 +1,187 @@
+# ecoatlas_api/schema_upgrade.py
+"""
+Mise à niveau minimale du schéma au démarrage.
+
+create_all crée les tables manquantes mais n'ajoute pas de colonne à une
+table existante. Les colonnes ajoutées après coup sont listées ici et
+créées (ALTER TABLE ... ADD COLUMN) si la base ne les a pas encore, pour
+éviter un /admin/reset qui perdrait les données.
+
+ensure_schema évite tout ce travail (une requête d'inspection par table)
+quand la base porte déjà l'empreinte du schéma courant : une seule
+requête au démarrage.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import models
+from .database import Base
+from .services.spatial_index import grid_cell
+
+# (modèle, colonnes ajoutées, index associés)
+ADDED_COLUMNS = [
+    (models.Occurrence, ("grid_cell",), ("idx_occ_grid_cell",)),
+    (models.Species, ("source_key", "content_hash"), ("idx_species_source_key",)),
+    (models.Species, (), ("idx_species_gbif_id",)),
+    (models.Occurrence, ("gbif_key",), ("idx_occ_gbif_key",)),
+]
+
+
+# Espèces en double par gbif_id (anciens imports) : dupe_id -> keep_id, la
+# plus ancienne (MIN(id)) étant gardée. Reprise par migrate_sqlite_to_postgres.
+SPECIES_DUPES_SQL = (
+    "SELECT s.id AS dupe_id, k.keep_id FROM species s "
+    "JOIN (SELECT gbif_id, MIN(id) AS keep_id FROM species "
+    "      WHERE gbif_id IS NOT NULL GROUP BY gbif_id HAVING COUNT(*) > 1) k "
+    "ON s.gbif_id = k.gbif_id AND s.id <> k.keep_id"
+)
+
+
+def _dedupe_species_gbif_id(conn) -> None:
+    """Les anciens imports GBIF créaient une espèce par passage : on garde
+    la plus ancienne par gbif_id, les doublons partent avec leurs
+    occurrences et sources (les checkpoints pointent vers celle gardée)."""
+    conn.exec_driver_sql(f"CREATE TEMPORARY TABLE species_dupes AS {SPECIES_DUPES_SQL}")
+    dupes = "SELECT dupe_id FROM species_dupes"
+    conn.exec_driver_sql(
+        "UPDATE import_checkpoints SET species_id = "
+        "(SELECT keep_id FROM species_dupes WHERE dupe_id = import_checkpoints.species_id) "
+        f"WHERE species_id IN ({dupes})"
+    )
+    conn.exec_driver_sql(f"DELETE FROM sources WHERE species_id IN ({dupes})")
+    conn.exec_driver_sql(f"DELETE FROM occurrences WHERE species_id IN ({dupes})")
+    conn.exec_driver_sql(f"DELETE FROM species WHERE id IN ({dupes})")
+    conn.exec_driver_sql("DROP TABLE species_dupes")
+
+
+BACKFILL_BATCH = 10_000
+
+
+def _backfill_grid_cell(conn) -> None:
+    """Calcule grid_cell des occurrences existantes (par lots d'id)."""
+    occ = models.Occurrence.__table__
+    stmt = text("UPDATE occurrences SET grid_cell = :cell WHERE id = :id")
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(occ.c.id, occ.c.lat, occ.c.lng)
+            .where(occ.c.id > last_id, occ.c.grid_cell.is_(None))
+            .order_by(occ.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        conn.execute(stmt, [{"cell": grid_cell(lat, lng), "id": id_} for id_, lat, lng in rows])
+        last_id = rows[-1][0]
+
+
+# Après l'ajout d'une colonne à une table déjà remplie
+AFTER_COLUMN = {
+    "occurrences.grid_cell": _backfill_grid_cell,
+}
+
+# Avant la création d'un index unique sur des données existantes
+BEFORE_INDEX = {
+    "idx_species_gbif_id": _dedupe_species_gbif_id,
+}
+
+
+# Tables jetables recréées si elles datent d'avant leurs clés étrangères
+# (create_all n'ajoute pas de contrainte à une table existante)
+REBUILT_WITHOUT_FK = [models.ImportCheckpoint]
+
+
+def _rebuild_tables_without_fk(engine: Engine, insp) -> list[str]:
+    rebuilt = []
+    for model in REBUILT_WITHOUT_FK:
+        table = model.__table__
+        if table.foreign_keys and not insp.get_foreign_keys(table.name):
+            table.drop(engine)
+            table.create(engine)
+            rebuilt.append(table.name)
+    return rebuilt
+
+
+def upgrade_schema(engine: Engine) -> list[str]:
+    """Ajoute les colonnes manquantes ; renvoie la liste des ajouts."""
+    insp = inspect(engine)
+    added = []
+
+    for name in _rebuild_tables_without_fk(engine, insp):
+        print(f"[WARN] Table {name} recreated with its foreign keys (import progress reset)")
+
+    with engine.begin() as conn:
+        for model, columns, index_names in ADDED_COLUMNS:
+            table = model.__table__
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            missing = [table.c[name] for name in columns if name not in existing]
+
+            for col in missing:
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}")
+                added.append(f"{table.name}.{col.name}")
+                if f"{table.name}.{col.name}" in AFTER_COLUMN:
+                    AFTER_COLUMN[f"{table.name}.{col.name}"](conn)
+
+            present = {i["name"] for i in insp.get_indexes(table.name)}
+            for idx in table.indexes:
+                if idx.name in index_names and idx.name not in present:
+                    if idx.name in BEFORE_INDEX:
+                        BEFORE_INDEX[idx.name](conn)
+                    idx.create(conn)
+
+    return added
+
+
+# ---------------------------------------------------------
+# Vérification rapide
+# ---------------------------------------------------------
+
+def schema_fingerprint() -> str:
+    """Empreinte des tables / colonnes / clés étrangères / index déclarés dans models."""
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts += [
+            f"{c.name}:{c.type!r}:{c.nullable}:{sorted(fk.target_fullname for fk in c.foreign_keys)}"
+            for c in table.columns
+        ]
+        parts += sorted(f"idx:{i.name}" for i in table.indexes)
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def schema_is_current(engine: Engine, fingerprint: str) -> bool:
+    try:
+        with engine.connect() as conn:
+            stored = conn.execute(
+                select(models.SchemaInfo.fingerprint).where(models.SchemaInfo.id == 1)
+            ).scalar()
+    except SQLAlchemyError:
+        # Table absente (base neuve ou antérieure à schema_info)
+        return False
+    return stored == fingerprint
+
+
+def ensure_schema(engine: Engine) -> list[str] | None:
+    """create_all + upgrade_schema, sauf si le schéma est déjà à jour.
+    Renvoie None si rien n'a été fait, sinon les colonnes ajoutées."""
+    fingerprint = schema_fingerprint()
+    if schema_is_current(engine, fingerprint):
+        return None
+
+    Base.metadata.create_all(bind=engine)
+    added = upgrade_schema(engine)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with engine.begin() as conn:
+        conn.execute(models.SchemaInfo.__table__.delete())
+        conn.execute(
+            models.SchemaInfo.__table__.insert(),
+            {"id": 1, "fingerprint": fingerprint, "updated_at": now},
+        )
+    return added
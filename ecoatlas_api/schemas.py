@@ -5,7 +5,7 @@ Used for clean API responses.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 
 # OCCURRENCE -----------------------------------------
@@ -28,8 +28,47 @@ class OccurrenceOut(OccurrenceBase):
         from_attributes = True
 
 
+class OccurrenceGeo(OccurrenceOut):
+    species_id: int
+
+    class Config:
+        from_attributes = True
+
+
+# REQUÊTES SPATIALES (bbox / polygone) ---------------
+
+class SpatialQueryOut(BaseModel):
+    total: int
+    truncated: bool
+    species_ids: List[int] = []
+    occurrences: List[OccurrenceGeo] = []
+
+
+# TUILES (clusters d'occurrences) --------------------
+
+class OccurrenceCluster(BaseModel):
+    lat: float
+    lng: float
+    count: int
+    species_count: int
+
+
+class OccurrenceTile(BaseModel):
+    z: int
+    x: int
+    y: int
+    total: int
+    clusters: List[OccurrenceCluster] = []
+
+
 # SPECIES --------------------------------------------
 
+class Suggestion(BaseModel):
+    id: int
+    common_name: Optional[str] = None
+    scientific_name: Optional[str] = None
+
+
 class SpeciesBase(BaseModel):
     id: int
     common_name: Optional[str] = None
@@ -48,6 +87,11 @@ class SpeciesSummary(SpeciesBase):
         from_attributes = True
 
 
+class SpeciesPage(BaseModel):
+    items: List[SpeciesSummary] = []
+    next_cursor: Optional[str] = None
+
+
 class SpeciesDetail(SpeciesBase):
     population: Optional[int] = None
     size_adult_cm: Optional[float] = None
@@ -62,11 +106,28 @@ class SpeciesDetail(SpeciesBase):
     photo_url: Optional[str] = None
 
     occurrences: List[OccurrenceOut] = []
+    # Présent seulement avec include=occurrences : liste coupée à occurrences_limit
+    occurrences_truncated: Optional[bool] = None
 
     class Config:
         from_attributes = True
 
 
+# FRISE CHRONOLOGIQUE (slider) ----------------------
+
+class TimelinePoint(BaseModel):
+    year: int
+    species_count: int
+    occurrence_count: int
+
+
+class Timeline(BaseModel):
+    from_year: Optional[int] = None
+    to_year: Optional[int] = None
+    points: List[TimelinePoint] = []
+    breakdown: Optional[Dict[str, List[TimelinePoint]]] = None
+
+
 # BIO ENRICHIE (API /bio) ----------------------------
 
 class SpeciesBio(BaseModel):
@@ -0,0 +1,261 @@
+# ecoatlas_api/services/bulk_loader.py
+"""
+Chargement en masse du catalogue (espèces + occurrences).
+
+Remplace les boucles "un commit + refresh par espèce" :
+- les espèces sont insérées par lots, les ids récupérés via RETURNING
+  (dans l'ordre des lignes envoyées) ;
+- les occurrences sont insérées par lots (executemany du driver), ou en
+  COPY FROM STDIN sur PostgreSQL (psycopg2) ;
+- imports GBIF : upserts (INSERT ... ON CONFLICT DO UPDATE, PostgreSQL
+  et SQLite) sur gbif_id / gbif_key, un nouvel import ne duplique rien ;
+- rien n'est commité ici : l'appelant fait un seul commit à la fin.
+
+Les occurrences sont consommées comme un itérable (générateur) : la
+mémoire ne dépend que de la taille des lots.
+"""
+
+from __future__ import annotations
+
+import io
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import models
+from .spatial_index import grid_cell
+
+SPECIES_BATCH = 1000
+OCCURRENCE_BATCH = 10_000
+COPY_BATCH = 200_000
+
+SPECIES_COLUMNS = (
+    "gbif_id",
+    "common_name",
+    "scientific_name",
+    "life_zone",
+    "biome",
+    "source_key",
+    "content_hash",
+)
+# Tuples attendus par insert_occurrences
+OCCURRENCE_INPUT = ("species_id", "lat", "lng", "start_year", "end_year", "source")
+OCCURRENCE_COLUMNS = ("species_id", "lat", "lng", "grid_cell", "start_year", "end_year", "source")
+# Tuples attendus par upsert_occurrences
+GBIF_OCCURRENCE_INPUT = OCCURRENCE_INPUT + ("gbif_key",)
+GBIF_OCCURRENCE_COLUMNS = OCCURRENCE_COLUMNS + ("gbif_key",)
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _batches(rows: Iterable, size: int):
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _use_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+# ---------------------------------------------------------
+# Vidage
+# ---------------------------------------------------------
+
+def clear_catalog(db: Session) -> None:
+    """Vide sources + occurrences + species (TRUNCATE sur PostgreSQL).
+
+    Les checkpoints d'import GBIF pointent vers des espèces supprimées :
+    ils sont vidés aussi, le prochain import repart de zéro.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("TRUNCATE import_checkpoints, sources, occurrences, species CASCADE"))
+    else:
+        db.query(models.ImportCheckpoint).delete()
+        db.query(models.Source).delete()
+        db.query(models.Occurrence).delete()
+        db.query(models.Species).delete()
+
+
+@contextmanager
+def deferred_indexes(db: Session, model):
+    """Supprime les index secondaires de la table le temps du chargement
+    puis les recrée d'un coup (bien plus rapide que de les maintenir ligne
+    à ligne).
+
+    Réservé aux rechargements complets : après clear_catalog, dans la même
+    transaction. Si la table n'est pas vide (chargement incrémental), les
+    index sont laissés en place.
+
+    Verrous : sur PostgreSQL, DROP INDEX prend un verrou ACCESS EXCLUSIVE
+    sur la table jusqu'au commit ; lectures et écritures concurrentes
+    attendent la fin du chargement. Le TRUNCATE de clear_catalog prend
+    déjà ce verrou pour la même durée : supprimer les index ne bloque
+    rien de plus. Sur SQLite, l'écriture verrouille de toute façon la base.
+    """
+    conn = db.connection()
+    table = model.__table__
+    if conn.execute(select(table).limit(1)).first() is not None:
+        yield
+        return
+    indexes = list(table.indexes)
+    for idx in indexes:
+        idx.drop(conn, checkfirst=True)
+    yield
+    for idx in indexes:
+        idx.create(conn)
+
+
+# ---------------------------------------------------------
+# Espèces
+# ---------------------------------------------------------
+
+def insert_species(db: Session, rows: list[dict]) -> list[int]:
+    """Insère les espèces (dicts SPECIES_COLUMNS, clés manquantes = NULL)
+    et renvoie leurs ids dans le même ordre."""
+    stmt = insert(models.Species).returning(models.Species.id, sort_by_parameter_order=True)
+    ids: list[int] = []
+    for batch in _batches(rows, SPECIES_BATCH):
+        params = [{c: r.get(c) for c in SPECIES_COLUMNS} for r in batch]
+        ids.extend(db.execute(stmt, params).scalars().all())
+    return ids
+
+
+# ---------------------------------------------------------
+# Occurrences
+# ---------------------------------------------------------
+
+def _with_grid_cell(rows: Iterable[tuple]):
+    for species_id, lat, lng, start_year, end_year, source in rows:
+        yield species_id, lat, lng, grid_cell(lat, lng), start_year, end_year, source
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value) -> str:
+    # Format texte de COPY : \N = NULL, tabulations / retours échappés
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+
+def copy_rows(conn, table: str, columns: Iterable[str], rows: Iterable[tuple]) -> int:
+    """COPY FROM STDIN (format texte) de tuples dans table, par lots de
+    COPY_BATCH ; conn = Connection SQLAlchemy (psycopg2), sa transaction
+    est utilisée. Renvoie le nombre de lignes."""
+    if not conn.in_transaction():
+        # Le curseur DBAPI ne déclenche pas l'autobegin : sans cela,
+        # conn.commit() ne validerait rien
+        conn.begin()
+    cursor = conn.connection.dbapi_connection.cursor()
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    count = 0
+    try:
+        for batch in _batches(rows, COPY_BATCH):
+            buf = io.StringIO()
+            buf.writelines("\t".join(map(_copy_value, r)) + "\n" for r in batch)
+            buf.seek(0)
+            cursor.copy_expert(sql, buf)
+            count += len(batch)
+    finally:
+        cursor.close()
+    return count
+
+
+def _copy_occurrences(db: Session, rows: Iterable[tuple]) -> int:
+    # Même connexion (donc même transaction) que la session
+    return copy_rows(db.connection(), "occurrences", OCCURRENCE_COLUMNS, rows)
+
+
+_PLACEHOLDERS = {"qmark": "?", "format": "%s", "pyformat": "%s"}
+
+
+def insert_occurrences(db: Session, rows: Iterable[tuple]) -> int:
+    """Insère des tuples OCCURRENCE_INPUT (grid_cell calculé ici) ;
+    renvoie le nombre de lignes."""
+    rows = _with_grid_cell(rows)
+    if _use_copy(db):
+        return _copy_occurrences(db, rows)
+
+    conn = db.connection()
+    placeholder = _PLACEHOLDERS.get(conn.dialect.paramstyle)
+    count = 0
+    for batch in _batches(rows, OCCURRENCE_BATCH):
+        if placeholder:
+            # executemany direct du driver : pas de dict ni de compilation par lot
+            conn.exec_driver_sql(
+                f"INSERT INTO occurrences ({', '.join(OCCURRENCE_COLUMNS)}) "
+                f"VALUES ({', '.join([placeholder] * len(OCCURRENCE_COLUMNS))})",
+                batch,
+            )
+        else:
+            conn.execute(
+                insert(models.Occurrence.__table__),
+                [dict(zip(OCCURRENCE_COLUMNS, r)) for r in batch],
+            )
+        count += len(batch)
+    return count
+
+
+# ---------------------------------------------------------
+# Upserts GBIF
+# ---------------------------------------------------------
+
+def _upsert(db: Session, model):
+    dialect = db.get_bind().dialect.name
+    try:
+        return _UPSERT_INSERTS[dialect](model.__table__)
+    except KeyError:
+        raise ValueError(f"Upsert non supporté pour {dialect}") from None
+
+
+def upsert_species(db: Session, rows: list[dict]) -> list[int]:
+    """Insère ou met à jour (clé gbif_id) des espèces GBIF ; renvoie leurs
+    ids dans l'ordre des lignes. Les colonnes d'enrichissement des espèces
+    existantes ne sont pas touchées."""
+    by_key = {r["gbif_id"]: r for r in rows}
+    stmt = _upsert(db, models.Species)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["gbif_id"],
+        set_={
+            "scientific_name": stmt.excluded.scientific_name,
+            "common_name": func.coalesce(stmt.excluded.common_name, models.Species.__table__.c.common_name),
+        },
+    ).returning(models.Species.__table__.c.gbif_id, models.Species.__table__.c.id)
+
+    ids: dict[int, int] = {}
+    for batch in _batches(by_key.values(), SPECIES_BATCH):
+        params = [{c: r.get(c) for c in SPECIES_COLUMNS} for r in batch]
+        ids.update(db.execute(stmt, params).tuples().all())
+    return [ids[r["gbif_id"]] for r in rows]
+
+
+def upsert_occurrences(db: Session, rows: Iterable[tuple]) -> int:
+    """Insère ou met à jour (clé gbif_key) des tuples GBIF_OCCURRENCE_INPUT ;
+    renvoie le nombre de lignes écrites (une clé répétée dans un lot ne
+    compte qu'une fois)."""
+    stmt = _upsert(db, models.Occurrence)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["gbif_key"],
+        set_={c: stmt.excluded[c] for c in GBIF_OCCURRENCE_COLUMNS if c != "gbif_key"},
+    )
+    conn = db.connection()
+    count = 0
+    for batch in _batches(rows, OCCURRENCE_BATCH):
+        # Même clé deux fois dans une instruction : refusé par PostgreSQL
+        unique = {r[-1] if r[-1] is not None else object(): r for r in batch}.values()
+        params = [
+            dict(zip(GBIF_OCCURRENCE_COLUMNS, (species_id, lat, lng, grid_cell(lat, lng), start, end, source, key)))
+            for species_id, lat, lng, start, end, source, key in unique
+        ]
+        conn.execute(stmt, params)
+        count += len(params)
+    return count
@@ -0,0 +1,118 @@
+# ecoatlas_api/services/data_version.py
+"""
+Version globale des données du catalogue.
+
+Chaque chemin d'écriture (reload, reset, imports, enrichissement) appelle
+bump(). Le jeton est stocké en base (table data_version) pour que tous
+les processus le voient : scripts d'import, workers uvicorn.
+
+- current() : jeton courant, relu en base au plus toutes les
+  POLL_INTERVAL secondes (jamais à chaque requête) ;
+- on_change(fn) : fn() est appelée quand le catalogue (espèces,
+  occurrences) change, ici ou dans un autre processus. Les index en
+  mémoire s'y abonnent au lieu d'être invalidés un par un.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+
+POLL_INTERVAL = float(os.getenv("DATA_VERSION_POLL_S", "2"))
+
+# Change à chaque déploiement : une nouvelle version du code peut
+# sérialiser différemment les mêmes données.
+BUILD_ID = (os.getenv("RENDER_GIT_COMMIT") or uuid.uuid4().hex)[:12]
+
+_listeners: list = []
+_lock = threading.Lock()
+_version: str | None = None
+_catalog_version: str | None = None
+_checked_at = 0.0
+
+
+def on_change(fn):
+    """Abonne fn() aux changements du catalogue (utilisable en décorateur)."""
+    _listeners.append(fn)
+    return fn
+
+
+def _new_token() -> str:
+    return uuid.uuid4().hex
+
+
+def _apply(version: str, catalog_version: str, force: bool = False) -> None:
+    global _version, _catalog_version, _checked_at
+
+    with _lock:
+        changed = _catalog_version is not None and catalog_version != _catalog_version
+        _version, _catalog_version = version, catalog_version
+        _checked_at = time.monotonic()
+
+    if changed or force:
+        for fn in _listeners:
+            fn()
+
+
+def _write(db: Session, catalog: bool) -> tuple[str, str]:
+    row = db.get(models.DataVersion, 1)
+    token = _new_token()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if row is None:
+        row = models.DataVersion(id=1, version=token, catalog_version=token, updated_at=now)
+        db.add(row)
+    else:
+        row.version = token
+        if catalog:
+            row.catalog_version = token
+        row.updated_at = now
+    return row.version, row.catalog_version
+
+
+def bump(catalog: bool = True) -> str:
+    """Nouveau jeton de version, à appeler après le commit des données.
+
+    catalog=False : seules des colonnes d'enrichissement ont changé, les
+    index en mémoire (noms, années, positions) restent valides.
+    """
+    with SessionLocal() as db:
+        version, catalog_version = _write(db, catalog)
+        db.commit()
+
+    _apply(version, catalog_version, force=catalog)
+    return version
+
+
+def refresh() -> str:
+    """Relit le jeton en base (le crée si la table est vide)."""
+    with SessionLocal() as db:
+        row = db.get(models.DataVersion, 1)
+        if row is None:
+            version, catalog_version = _write(db, catalog=True)
+            db.commit()
+        else:
+            version, catalog_version = row.version, row.catalog_version
+    _apply(version, catalog_version)
+    return version
+
+
+def is_stale() -> bool:
+    return _version is None or time.monotonic() - _checked_at > POLL_INTERVAL
+
+
+def current() -> str:
+    if is_stale():
+        return refresh()
+    return _version
+
+
+def etag() -> str:
+    return f'"{BUILD_ID}-{current()}"'
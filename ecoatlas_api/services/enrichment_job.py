@@ -0,0 +1,335 @@
+# ecoatlas_api/services/enrichment_job.py
+"""
+Enrichissement Wikidata en masse de toutes les espèces.
+
+Au lieu de 2 appels HTTP par espèce (recherche + entité), on :
+1. résout les QID par lots via SPARQL (propriété P225 = nom scientifique),
+   en réutilisant ceux déjà présents dans wikidata_cache ;
+2. récupère les entités par lots de 50 avec wbgetentities ;
+3. parse les mêmes propriétés que wikidata_service.parse_entity et
+   bio_service.parse_bio_entity ;
+4. complète les photos manquantes (pas d'image P18) par les vignettes
+   Commons, par lots de 50 titres ;
+5. écrit les colonnes d'enrichissement de Species en UPDATE groupés.
+
+Les appels passent par le client async partagé (services/http_client.py),
+les accès base par asyncio.to_thread avec des sessions courtes.
+
+Usage :
+    python -m ecoatlas_api.services.enrichment_job [--overwrite]
+ou la route POST /admin/enrich.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+
+import httpx
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import data_version
+from ..bio_service import parse_bio_entity
+from ..database import SessionLocal
+from .http_client import close_http_client, get_async_client
+from .wikidata_cache import store as store_wikidata
+from .wikidata_service import (
+    COMMONS_TITLES_BATCH,
+    WIKIDATA_SEARCH_API,
+    fetch_commons_thumbnails,
+    parse_entity,
+)
+from .wikimedia_service import wikimedia_image_url
+
+WIKIDATA_SPARQL_URL = os.getenv("WIKIDATA_SPARQL_URL", "https://query.wikidata.org/sparql")
+
+SPARQL_BATCH = 200       # noms par requête SPARQL
+ENTITIES_BATCH = 50      # maximum autorisé par wbgetentities
+UPDATE_BATCH = 500
+LOOKUP_BATCH = 500       # noms par IN (limite de paramètres SQLite)
+
+ENRICHED_COLUMNS = (
+    "lifespan_years",
+    "iucn_status",
+    "diet",
+    "speed_kmh",
+    "size_adult_cm",
+    "weight_adult_kg",
+    "habitat",
+    "range_description",
+    "population",
+    "photo_url",
+)
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _sparql_literal(name: str) -> str:
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+# ---------------------------------------------------------
+# Appels Wikidata groupés
+# ---------------------------------------------------------
+# Un lot en échec est compté et sauté : les autres espèces sont quand même
+# enrichies (celles du lot le seront au prochain passage).
+
+def _batch_failed(stats: dict, what: str, error: Exception) -> None:
+    stats["failed_batches"] += 1
+    print(f"[WARN] Enrichment: {what} batch failed: {error}")
+
+
+async def resolve_qids(names: list[str], stats: dict) -> dict[str, str]:
+    """Nom scientifique -> QID, par lots SPARQL."""
+    client = get_async_client()
+    qids: dict[str, str] = {}
+
+    for batch in _chunks(names, SPARQL_BATCH):
+        values = " ".join(_sparql_literal(n) for n in batch)
+        query = (
+            "SELECT ?item ?name WHERE { "
+            f"VALUES ?name {{ {values} }} ?item wdt:P225 ?name . }}"
+        )
+        stats["requests"] += 1
+        try:
+            r = await client.post(
+                WIKIDATA_SPARQL_URL,
+                data={"query": query, "format": "json"},
+                headers={"Accept": "application/sparql-results+json"},
+                timeout=60.0,
+            )
+            r.raise_for_status()
+            bindings = r.json().get("results", {}).get("bindings", [])
+        except (httpx.HTTPError, ValueError) as e:
+            _batch_failed(stats, "SPARQL", e)
+            continue
+
+        for b in bindings:
+            name = b["name"]["value"]
+            qid = b["item"]["value"].rsplit("/", 1)[-1]
+            # Plusieurs items possibles (homonymes) : on garde le plus ancien
+            if name not in qids or int(qid[1:]) < int(qids[name][1:]):
+                qids[name] = qid
+
+    return qids
+
+
+async def fetch_entities(qids: list[str], stats: dict) -> dict[str, dict]:
+    """QID -> entité brute, par lots de 50 (wbgetentities)."""
+    client = get_async_client()
+    entities: dict[str, dict] = {}
+
+    for batch in _chunks(qids, ENTITIES_BATCH):
+        stats["requests"] += 1
+        try:
+            r = await client.get(
+                WIKIDATA_SEARCH_API,
+                params={
+                    "action": "wbgetentities",
+                    "ids": "|".join(batch),
+                    "props": "claims|labels|descriptions",
+                    "format": "json",
+                },
+                timeout=30.0,
+            )
+            r.raise_for_status()
+            found = r.json().get("entities") or {}
+        except (httpx.HTTPError, ValueError) as e:
+            _batch_failed(stats, "wbgetentities", e)
+            continue
+
+        for qid, ent in found.items():
+            if "missing" not in ent:
+                entities[qid] = ent
+
+    return entities
+
+
+# ---------------------------------------------------------
+# Fusion des deux parseurs -> colonnes Species
+# ---------------------------------------------------------
+
+def species_values(entity: dict) -> tuple[dict, dict]:
+    """Renvoie (données wikidata_service, colonnes Species non nulles)."""
+    data = parse_entity(entity)
+    return data, merge_values(data, parse_bio_entity(entity))
+
+
+def merge_values(data: dict, bio: dict) -> dict:
+    """Colonnes Species (non nulles) à partir des sorties de
+    wikidata_service.parse_entity et bio_service.parse_bio_entity."""
+    size_cm = data.get("size_adult_cm")
+    if size_cm is None and bio.get("size_m") is not None:
+        size_cm = bio["size_m"] * 100.0
+    population = bio.get("population")
+
+    values = {
+        "lifespan_years": data.get("lifespan_years") or bio.get("lifespan_years"),
+        "iucn_status": data.get("iucn_status") or bio.get("iucn_status"),
+        "diet": data.get("diet"),
+        "speed_kmh": data.get("speed_kmh") or bio.get("speed_kmh"),
+        "size_adult_cm": size_cm,
+        "weight_adult_kg": data.get("weight_adult_kg") or bio.get("weight_kg"),
+        "habitat": data.get("habitat") or bio.get("habitat"),
+        "range_description": data.get("range_description"),
+        "population": int(population) if population is not None else None,
+        "photo_url": wikimedia_image_url(data.get("image_filename")) or data.get("commons_thumbnail"),
+    }
+    return {k: v for k, v in values.items() if v is not None}
+
+
+# ---------------------------------------------------------
+# Écriture groupée
+# ---------------------------------------------------------
+
+def _changes(rows, values_by_id: dict[int, dict | None], overwrite: bool) -> list[dict]:
+    changes = []
+    for r in rows:
+        values = values_by_id.get(r.id)
+        if not values:
+            continue
+        if not overwrite:
+            values = {k: v for k, v in values.items() if getattr(r, k) is None}
+        if values:
+            changes.append({"id": r.id, **values})
+    return changes
+
+
+def _bulk_update(db: Session, changes: list[dict]) -> None:
+    # UPDATE ... WHERE id = ? exécuté en executemany, par lots
+    for batch in _chunks(changes, UPDATE_BATCH):
+        db.execute(update(models.Species), batch)
+
+
+def write_species_values(db: Session, values_by_id: dict[int, dict], overwrite: bool = False) -> int:
+    """Applique des colonnes d'enrichissement à plusieurs espèces en une
+    transaction (sans commit) ; renvoie le nombre de lignes modifiées."""
+    if not values_by_id:
+        return 0
+    rows = (
+        db.query(models.Species.id, *[getattr(models.Species, c) for c in ENRICHED_COLUMNS])
+        .filter(models.Species.id.in_(list(values_by_id)))
+        .all()
+    )
+    changes = _changes(rows, values_by_id, overwrite)
+    _bulk_update(db, changes)
+    return len(changes)
+
+
+# ---------------------------------------------------------
+# Job
+# ---------------------------------------------------------
+
+def _in_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+def _load_species(db: Session) -> tuple[list, dict[str, str]]:
+    """Espèces (colonnes d'enrichissement) et QID déjà connus du cache."""
+    rows = db.query(
+        models.Species.id,
+        models.Species.scientific_name,
+        *[getattr(models.Species, c) for c in ENRICHED_COLUMNS],
+    ).all()
+    names = sorted({r.scientific_name for r in rows if r.scientific_name})
+    qids: dict[str, str] = {}
+    for batch in _chunks(names, LOOKUP_BATCH):
+        qids.update(
+            db.query(models.WikidataCache.scientific_name, models.WikidataCache.qid)
+            .filter(
+                models.WikidataCache.scientific_name.in_(batch),
+                models.WikidataCache.qid.isnot(None),
+            )
+            .all()
+        )
+    return rows, qids
+
+
+def _write_results(db: Session, rows, cached: dict, parsed: dict, overwrite: bool) -> int:
+    for name, (qid, data) in cached.items():
+        store_wikidata(db, name, "ok", qid, data, commit=False)
+    changes = _changes(rows, {r.id: parsed.get(r.scientific_name) for r in rows}, overwrite)
+    _bulk_update(db, changes)
+    db.commit()
+    return len(changes)
+
+
+async def enrich_all_species(overwrite: bool = False) -> dict:
+    """Enrichit toutes les espèces ; renvoie des statistiques.
+
+    Par défaut on ne remplit que les colonnes encore vides (comme
+    bio_service.build_species_bio) ; overwrite=True remplace tout.
+    """
+    t0 = time.perf_counter()
+    stats = {
+        "species": 0, "resolved": 0, "entities": 0, "updated": 0,
+        "requests": 0, "failed_batches": 0,
+    }
+
+    rows, qids = await asyncio.to_thread(_in_session, _load_species)
+    stats["species"] = len(rows)
+
+    names = sorted({r.scientific_name for r in rows if r.scientific_name})
+    missing = [n for n in names if n not in qids]
+    if missing:
+        qids.update(await resolve_qids(missing, stats))
+    stats["resolved"] = len(qids)
+
+    entities = await fetch_entities(sorted(set(qids.values())), stats)
+    stats["entities"] = len(entities)
+
+    # nom -> (qid, données du cache) et nom -> colonnes Species
+    cached: dict[str, tuple[str | None, dict]] = {}
+    parsed: dict[str, dict] = {}
+    for name, qid in qids.items():
+        ent = entities.get(qid)
+        if ent is None:
+            continue
+        data, values = species_values(ent)
+        cached[name] = (qid, data)
+        parsed[name] = values
+
+    # Sans image P18 : vignette Commons du même nom (cf. lookup_wikidata)
+    no_photo = [n for n in names if "photo_url" not in parsed.get(n, {})]
+    thumbs = await fetch_commons_thumbnails(no_photo) if no_photo else {}
+    stats["requests"] += (len(no_photo) + COMMONS_TITLES_BATCH - 1) // COMMONS_TITLES_BATCH
+    for name, thumb in thumbs.items():
+        qid, data = cached.get(name, (qids.get(name), {}))
+        cached[name] = (qid, {**data, "commons_thumbnail": thumb})
+        parsed[name] = {**parsed.get(name, {}), "photo_url": thumb}
+
+    updated = await asyncio.to_thread(_in_session, _write_results, rows, cached, parsed, overwrite)
+    if updated:
+        data_version.bump(catalog=False)
+
+    stats["updated"] = updated
+    stats["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+
+async def _main(overwrite: bool) -> dict:
+    try:
+        return await enrich_all_species(overwrite=overwrite)
+    finally:
+        await close_http_client()
+
+
+def main():
+    import sys
+
+    stats = asyncio.run(_main("--overwrite" in sys.argv))
+    print(f"🎉 Enrichissement terminé : {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# ecoatlas_api/services/enrichment_worker.py
+"""
+Worker d'enrichissement en arrière-plan.
+
+Les routes de lecture ne font plus d'appel amont ni d'écriture : elles
+renvoient ce qui est déjà en base et déposent l'espèce dans une file.
+Le worker (tâches asyncio démarrées par le lifespan de l'app) récupère
+les données Wikidata via le cache, puis écrit les résultats en base par
+lots (UPDATE groupés, une transaction par lot).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from ..database import SessionLocal
+from . import data_version
+from .enrichment_job import merge_values, write_species_values
+from .wikidata_cache import get_wikidata
+
+CONCURRENCY = 4          # appels Wikidata en parallèle
+FLUSH_BATCH = 50         # résultats par écriture
+FLUSH_INTERVAL = 2.0     # secondes max avant écriture
+MAX_QUEUE = 10_000
+REFRESH_COOLDOWN = 600   # secondes avant de re-rafraîchir une même espèce
+
+
+class EnrichmentWorker:
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._pending: set[int] = set()
+        self._refreshed_at: dict[int, float] = {}
+        self._results: dict[int, dict] = {}
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "skipped": 0,
+            "dropped": 0,
+            "processed": 0,
+            "failed": 0,
+            "flushes": 0,
+            "rows_updated": 0,
+            "last_flush_ms": None,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    # -----------------------------------------------------
+    # Cycle de vie
+    # -----------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=MAX_QUEUE)
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(CONCURRENCY)]
+        self._tasks.append(asyncio.create_task(self._flusher()))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush()
+        self._loop = None
+
+    # -----------------------------------------------------
+    # File
+    # -----------------------------------------------------
+
+    def enqueue(self, species_id: int, scientific_name: str | None) -> bool:
+        """Demande un rafraîchissement ; appelable depuis la boucle ou un thread."""
+        if not scientific_name or not self.running:
+            self._count("dropped")
+            return False
+
+        with self._lock:
+            recent = time.monotonic() - self._refreshed_at.get(species_id, -REFRESH_COOLDOWN)
+            if species_id in self._pending or recent < REFRESH_COOLDOWN:
+                self._stats["skipped"] += 1
+                return False
+            self._pending.add(species_id)
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._put(species_id, scientific_name)
+        else:
+            self._loop.call_soon_threadsafe(self._put, species_id, scientific_name)
+        return True
+
+    def _put(self, species_id: int, scientific_name: str) -> None:
+        try:
+            self._queue.put_nowait((species_id, scientific_name))
+            self._count("enqueued")
+        except asyncio.QueueFull:
+            with self._lock:
+                self._pending.discard(species_id)
+            self._count("dropped")
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    async def _consume(self) -> None:
+        while True:
+            species_id, name = await self._queue.get()
+            try:
+                data = await get_wikidata(name)
+                if data:
+                    values = merge_values(data, {})
+                    if values:
+                        self._results[species_id] = values
+                        if len(self._results) >= FLUSH_BATCH:
+                            self._batch_full.set()
+                self._count("processed")
+            except Exception as e:
+                self._count("failed")
+                print(f"[WARN] Enrichment failed for species {species_id}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(species_id)
+                    self._refreshed_at[species_id] = time.monotonic()
+                self._queue.task_done()
+
+    # -----------------------------------------------------
+    # Écriture groupée (write-behind)
+    # -----------------------------------------------------
+
+    async def _flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[WARN] Enrichment flush failed: {e}")
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._results:
+                return 0
+            batch, self._results = self._results, {}
+
+            t0 = time.perf_counter()
+            updated = await asyncio.to_thread(_write_batch, batch)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+
+            with self._lock:
+                s = self._stats
+                s["flushes"] += 1
+                s["rows_updated"] += updated
+                s["last_flush_ms"] = round(elapsed_ms, 2)
+                s["max_flush_ms"] = round(max(s["max_flush_ms"], elapsed_ms), 2)
+                s["total_flush_ms"] += elapsed_ms
+            return updated
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            pending = len(self._pending)
+        s["avg_flush_ms"] = round(s.pop("total_flush_ms") / s["flushes"], 2) if s["flushes"] else None
+        s["running"] = self.running
+        s["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        s["pending"] = pending
+        s["unflushed_results"] = len(self._results)
+        return s
+
+
+def _write_batch(batch: dict[int, dict]) -> int:
+    db = SessionLocal()
+    try:
+        updated = write_species_values(db, batch)
+        db.commit()
+    finally:
+        db.close()
+    if updated:
+        data_version.bump(catalog=False)
+    return updated
+
+
+worker = EnrichmentWorker()
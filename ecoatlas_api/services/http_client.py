@@ -0,0 +1,54 @@
+# ecoatlas_api/services/http_client.py
+"""
+Client HTTP partagé pour les appels sortants (Wikidata, Wikimedia, GBIF…).
+
+Un httpx.AsyncClient unique, créé / fermé par le lifespan de l'app :
+keep-alive + HTTP/2, donc plus de handshake TCP+TLS à chaque appel. Les
+scripts (gbif_importer, enrichment_job) le créent à la demande et le
+ferment en fin d'exécution.
+"""
+
+import httpx
+
+USER_AGENT = "EcoAtlasAPI/0.1 (https://github.com/Maelouuu/ecoatlas-api)"
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+LIMITS = httpx.Limits(
+    max_connections=50,
+    max_keepalive_connections=20,
+    keepalive_expiry=60.0,
+)
+
+_async_client: httpx.AsyncClient | None = None
+
+
+def _client_kwargs() -> dict:
+    return {
+        "http2": True,
+        "timeout": TIMEOUT,
+        "limits": LIMITS,
+        "headers": {"User-Agent": USER_AGENT},
+        "follow_redirects": True,
+    }
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(**_client_kwargs())
+    return _async_client
+
+
+async def close_http_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Client async de l'application (créé à la volée hors lifespan,
+    par ex. dans un script ou un test)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(**_client_kwargs())
+    return _async_client
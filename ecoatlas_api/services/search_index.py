@@ -0,0 +1,181 @@
+# ecoatlas_api/services/search_index.py
+"""
+Moteur de recherche en mémoire sur les noms d'espèces.
+
+- index inversé de trigrammes sur les noms "pliés" (minuscules, sans
+  accents : "Forêt" -> "foret"), commun + scientifique ;
+- classement par pertinence : exact > préfixe > début de mot > sous-chaîne,
+  le nom commun pesant un peu plus que le nom scientifique.
+
+Le coût d'une requête dépend de la taille des listes de trigrammes
+intersectées, pas de la taille du catalogue.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from bisect import bisect_right
+import unicodedata
+from array import array
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import data_version
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = 100, 75, 50, 25
+# Entiers (nom commun x1, scientifique x0,8) : le score entre dans la clé
+# de tri des curseurs, cf. pagination.CURSOR_KEYS
+COMMON_BOOST = 10
+SCIENTIFIC_BOOST = 8
+
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+_index: "SearchIndex | None" = None
+_lock = threading.Lock()
+
+
+def fold(text: str | None) -> str:
+    """Minuscules, sans accents ni ponctuation : " Forêt-d'Œuf " -> "foret d oeuf"."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text.casefold().translate(_LIGATURES))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def _grams(padded: str) -> set[str]:
+    """Trigrammes + bigrammes de début de mot (" x") d'une chaîne paddée."""
+    grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    grams.update(padded[i:i + 2] for i in range(len(padded) - 1) if padded[i] == " ")
+    return grams
+
+
+def _query_grams(q: str) -> set[str]:
+    # 1-2 caractères : on ne cherche qu'en début de mot
+    if len(q) < 3:
+        return {" " + q}
+    return {q[i:i + 3] for i in range(len(q) - 2)}
+
+
+def _field_score(name: str, q: str) -> int:
+    if not name:
+        return 0
+    if name == q:
+        return EXACT
+    if name.startswith(q):
+        return PREFIX
+    if (" " + name).find(" " + q) != -1:
+        return WORD_PREFIX
+    if len(q) >= 3 and q in name:
+        return SUBSTRING
+    return 0
+
+
+class SearchIndex:
+    def __init__(self, docs: list[tuple[int, str | None, str | None]]):
+        # id -> (nom commun plié, nom scientifique plié)
+        self.names: dict[int, tuple[str, str]] = {}
+        postings: dict[str, list[int]] = {}
+
+        for sid, common, scientific in sorted(docs):
+            names = (fold(common), fold(scientific))
+            self.names[sid] = names
+            grams = set()
+            for name in names:
+                if name:
+                    grams |= _grams(f" {name} ")
+            for g in grams:
+                postings.setdefault(g, []).append(sid)
+
+        # Listes triées (ids croissants) et compactes
+        self.postings: dict[str, array] = {g: array("I", ids) for g, ids in postings.items()}
+
+    def candidates(self, q: str) -> set[int]:
+        lists = []
+        for g in _query_grams(q):
+            ids = self.postings.get(g)
+            if ids is None:
+                return set()
+            lists.append(ids)
+        lists.sort(key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result.intersection_update(ids)
+            if not result:
+                break
+        return result
+
+    def score(self, sid: int, q: str) -> int:
+        common, scientific = self.names[sid]
+        return max(
+            _field_score(common, q) * COMMON_BOOST,
+            _field_score(scientific, q) * SCIENTIFIC_BOOST,
+        )
+
+    def ranked(self, query: str) -> list[tuple[tuple, int]]:
+        """Toutes les correspondances, triées par pertinence :
+        liste de (clé de tri, id)."""
+        q = fold(query)
+        if not q:
+            return []
+        out = []
+        for sid in self.candidates(q):
+            score = self.score(sid, q)
+            if score:
+                common, scientific = self.names[sid]
+                out.append(((-score, len(common or scientific), common, sid), sid))
+        out.sort()
+        return out
+
+    def search(self, query: str, limit: int, offset: int = 0) -> list[int]:
+        return [sid for _, sid in self.page(query, limit, offset)]
+
+    def page(
+        self, query: str, limit: int, offset: int = 0, after: tuple | None = None
+    ) -> list[tuple[tuple, int]]:
+        """Une page de ranked() : après la clé after si fournie, sinon à offset."""
+        ranked = self.ranked(query)
+        if after is not None:
+            offset = bisect_right(ranked, (tuple(after), float("inf")))
+        return ranked[offset:offset + limit]
+
+    def match_ids(self, query: str) -> list[int]:
+        """Ids correspondant à la recherche, sans classement."""
+        q = fold(query)
+        if not q:
+            return []
+        return sorted(sid for sid in self.candidates(q) if self.score(sid, q))
+
+
+# ---------------------------------------------------------
+# Construction / cache
+# ---------------------------------------------------------
+
+def build_search_index(db: Session) -> SearchIndex:
+    docs = db.query(
+        models.Species.id,
+        models.Species.common_name,
+        models.Species.scientific_name,
+    ).all()
+    return SearchIndex([tuple(d) for d in docs])
+
+
+def get_search_index(db: Session) -> SearchIndex:
+    global _index
+    index = _index
+    if index is not None:
+        return index
+    with _lock:
+        if _index is None:
+            _index = build_search_index(db)
+        return _index
+
+
+@data_version.on_change
+def invalidate_search_index() -> None:
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,252 @@
+# ecoatlas_api/services/seed_snapshot.py
+"""
+Snapshot binaire de species_base.json.
+
+Le JSON (~850 Ko, 54k lignes) n'est utile qu'aux chargements admin :
+plutôt que de le parser au démarrage de chaque worker, on le compile une
+fois au build (python -m ecoatlas_api.services.seed_snapshot) en un
+fichier binaire lu par mmap, à la demande :
+
+    en-tête "<4sHHIII32s4x" (56 octets)
+        magic b"ECSD", version, réservé,
+        nb espèces, nb occurrences, nb chaînes,
+        sha256 du JSON source (snapshot périmé => on relit le JSON)
+    espèces      "<qIIIIII32s" x nb espèces (64 octets chacune)
+        id JSON, indices de chaînes (common, scientific, life_zone,
+        biome), 1re occurrence, nb occurrences, content_hash
+    lat          float64[nb occurrences]
+    lng          float64[nb occurrences]
+    chaînes      uint32[nb chaînes + 1] (offsets) puis UTF-8
+
+Tout est little-endian ; les coordonnées sont lues sans copie.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import struct
+import sys
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "species_base.json"
+
+MAGIC = b"ECSD"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII32s4x")
+SPECIES = struct.Struct("<qIIIIII32s")
+
+NO_ID = -(2 ** 63)
+NO_STRING = 0xFFFFFFFF
+
+
+@dataclass(frozen=True, slots=True)
+class SeedRecord:
+    """Une espèce du fichier source (JSON ou snapshot)."""
+
+    id: int | None
+    common_name: str | None
+    scientific_name: str | None
+    life_zone: str | None
+    biome: str | None
+    content_hash: str
+    lats: Sequence[float]
+    lngs: Sequence[float]
+
+
+def record_hash(sp: dict) -> str:
+    """sha256 du JSON canonique de l'enregistrement."""
+    canonical = json.dumps(sp, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def from_json_record(sp: dict) -> SeedRecord:
+    occ = sp.get("occurrences", [])
+    return SeedRecord(
+        id=sp.get("id"),
+        common_name=sp.get("common_name"),
+        scientific_name=sp.get("scientific_name"),
+        life_zone=sp.get("life_zone"),
+        biome=sp.get("biome"),
+        content_hash=record_hash(sp),
+        lats=[float(o["lat"]) for o in occ],
+        lngs=[float(o["lng"]) for o in occ],
+    )
+
+
+def snapshot_path(json_path: Path) -> Path:
+    return json_path.with_suffix(".bin")
+
+
+def _file_sha256(path: Path) -> bytes:
+    return hashlib.sha256(path.read_bytes()).digest()
+
+
+# ---------------------------------------------------------
+# Build
+# ---------------------------------------------------------
+
+def build_snapshot(json_path: Path = DATA_PATH, out_path: Path | None = None) -> Path:
+    out_path = out_path or snapshot_path(json_path)
+    raw = json_path.read_bytes()
+    data = json.loads(raw)
+
+    strings: dict[str, int] = {}
+
+    def sid(value) -> int:
+        if value is None:
+            return NO_STRING
+        return strings.setdefault(value, len(strings))
+
+    species = bytearray()
+    lats, lngs = array("d"), array("d")
+    for sp in data:
+        rec = from_json_record(sp)
+        species += SPECIES.pack(
+            NO_ID if rec.id is None else int(rec.id),
+            sid(rec.common_name),
+            sid(rec.scientific_name),
+            sid(rec.life_zone),
+            sid(rec.biome),
+            len(lats),
+            len(rec.lats),
+            bytes.fromhex(rec.content_hash),
+        )
+        lats.extend(rec.lats)
+        lngs.extend(rec.lngs)
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("I", [0])
+    for s in encoded:
+        offsets.append(offsets[-1] + len(s))
+
+    if sys.byteorder != "little":
+        for a in (lats, lngs, offsets):
+            a.byteswap()
+
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, len(data), len(lats), len(encoded), hashlib.sha256(raw).digest()
+    )
+    tmp = out_path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(species)
+        f.write(lats.tobytes())
+        f.write(lngs.tobytes())
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+    tmp.replace(out_path)
+    return out_path
+
+
+# ---------------------------------------------------------
+# Lecture (mmap)
+# ---------------------------------------------------------
+
+class SeedSnapshot:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, n_species, n_occ, n_strings, source_sha = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Snapshot inconnu : {path}")
+
+        self.n_species = n_species
+        self.source_sha256 = source_sha
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+        self._species = view[offset:offset + SPECIES.size * n_species]
+        offset += SPECIES.size * n_species
+        self._lats = self._floats(view[offset:offset + 8 * n_occ])
+        offset += 8 * n_occ
+        self._lngs = self._floats(view[offset:offset + 8 * n_occ])
+        offset += 8 * n_occ
+
+        offsets = array("I")
+        offsets.frombytes(view[offset:offset + 4 * (n_strings + 1)])
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        blob = view[offset + 4 * (n_strings + 1):]
+        self._strings = [
+            bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in range(n_strings)
+        ]
+
+    @staticmethod
+    def _floats(buf: memoryview) -> Sequence[float]:
+        if sys.byteorder == "little":
+            return buf.cast("d")
+        a = array("d")
+        a.frombytes(buf)
+        a.byteswap()
+        return a
+
+    def _string(self, idx: int) -> str | None:
+        return None if idx == NO_STRING else self._strings[idx]
+
+    def records(self) -> list[SeedRecord]:
+        out = []
+        for ident, common, sci, zone, biome, start, count, digest in SPECIES.iter_unpack(self._species):
+            out.append(SeedRecord(
+                id=None if ident == NO_ID else ident,
+                common_name=self._string(common),
+                scientific_name=self._string(sci),
+                life_zone=self._string(zone),
+                biome=self._string(biome),
+                content_hash=digest.hex(),
+                lats=self._lats[start:start + count],
+                lngs=self._lngs[start:start + count],
+            ))
+        return out
+
+
+_lock = threading.Lock()
+_snapshots: dict[Path, SeedSnapshot] = {}
+
+
+def _open_snapshot(json_path: Path) -> SeedSnapshot | None:
+    """Snapshot à jour du JSON, ou None (absent / périmé)."""
+    bin_path = snapshot_path(json_path)
+    with _lock:
+        snap = _snapshots.get(json_path)
+        if snap is None:
+            if not bin_path.exists():
+                return None
+            snap = _snapshots[json_path] = SeedSnapshot(bin_path)
+
+    if snap.source_sha256 == _file_sha256(json_path):
+        return snap
+
+    # Peut-être reconstruit depuis l'ouverture : on relit une fois
+    with _lock:
+        _snapshots.pop(json_path, None)
+    if bin_path.exists():
+        snap = SeedSnapshot(bin_path)
+        if snap.source_sha256 == _file_sha256(json_path):
+            with _lock:
+                _snapshots[json_path] = snap
+            return snap
+    print(f"[WARN] {bin_path.name} is stale, falling back to {json_path.name}")
+    return None
+
+
+def load_seed(json_path: Path = DATA_PATH) -> list[SeedRecord]:
+    """Enregistrements du fichier source, via le snapshot s'il est à jour."""
+    snap = _open_snapshot(json_path)
+    if snap is not None:
+        return snap.records()
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        return [from_json_record(sp) for sp in json.load(f)]
+
+
+if __name__ == "__main__":
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else DATA_PATH
+    out = build_snapshot(src)
+    print(f"✅ Snapshot écrit : {out} ({out.stat().st_size} octets)")
@@ -0,0 +1,36 @@
+# ecoatlas_api/services/singleflight.py
+"""
+Single-flight : un seul appel amont en cours par clé.
+
+Quand plusieurs requêtes demandent la même donnée au même moment
+(espèce mise en avant dans l'app…), la première lance l'appel et les
+suivantes attendent son résultat au lieu de relancer le même appel.
+
+do_async() : l'appel tourne dans une tâche à part, l'annulation d'un
+appelant n'interrompt donc pas les autres.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._tasks: dict[tuple[int, Hashable], asyncio.Task] = {}
+
+    async def do_async(
+        self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        # Les tâches sont liées à leur boucle d'événements
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
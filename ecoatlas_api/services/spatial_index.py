@@ -0,0 +1,188 @@
+# ecoatlas_api/services/spatial_index.py
+"""
+Index spatial des occurrences : grille régulière de 1° (colonne grid_cell).
+
+cell = row * GRID_COLS + col, avec row = floor(lat + 90) et
+col = floor(lng + 180). Une bbox se traduit par une plage de cellules
+contiguës par rangée de latitude, ce qu'un btree sur grid_cell sert
+bien mieux que l'index composite (lat, lng).
+
+Les bbox qui traversent l'antiméridien (west > east) sont découpées
+en deux, et les polygones qui le traversent sont "dépliés" (lng + 360).
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from typing import Any, Iterable
+
+CELL_SIZE_DEG = 1.0
+GRID_COLS = int(360 / CELL_SIZE_DEG)
+GRID_ROWS = int(180 / CELL_SIZE_DEG)
+
+# Au-delà, on ne filtre plus par cellules mais par plage de latitude.
+MAX_CELL_RANGES = 64
+
+
+# ---------------------------------------------------------
+# Cellules
+# ---------------------------------------------------------
+
+def _row(lat: float) -> int:
+    return min(max(int(math.floor((lat + 90.0) / CELL_SIZE_DEG)), 0), GRID_ROWS - 1)
+
+
+def _col(lng: float) -> int:
+    return int(math.floor((lng + 180.0) / CELL_SIZE_DEG)) % GRID_COLS
+
+
+def grid_cell(lat: float, lng: float) -> int:
+    return _row(lat) * GRID_COLS + _col(lng)
+
+
+def grid_cell_default(context) -> int | None:
+    """Valeur par défaut SQLAlchemy de Occurrence.grid_cell."""
+    params = context.get_current_parameters()
+    lat, lng = params.get("lat"), params.get("lng")
+    if lat is None or lng is None:
+        return None
+    return grid_cell(lat, lng)
+
+
+# ---------------------------------------------------------
+# Bbox
+# ---------------------------------------------------------
+
+def split_bbox(
+    west: float, south: float, east: float, north: float
+) -> list[tuple[float, float, float, float]]:
+    """Renvoie une ou deux bbox qui ne traversent pas l'antiméridien."""
+    south, north = max(south, -90.0), min(north, 90.0)
+    if east - west >= 360.0:
+        return [(-180.0, south, 180.0, north)]
+
+    west = ((west + 180.0) % 360.0) - 180.0
+    east = ((east + 180.0) % 360.0) - 180.0
+    if east == -180.0:
+        east = 180.0
+    if west <= east:
+        return [(west, south, east, north)]
+    return [(west, south, 180.0, north), (-180.0, south, east, north)]
+
+
+def cell_ranges(boxes: Iterable[tuple[float, float, float, float]]) -> list[tuple[int, int]]:
+    """Plages [lo, hi] de grid_cell couvrant les bbox, fusionnées."""
+    ranges = []
+    for west, south, east, north in boxes:
+        first_col, last_col = _col(west), _col(min(east, 180.0 - 1e-9))
+        for row in range(_row(south), _row(north) + 1):
+            base = row * GRID_COLS
+            ranges.append((base + first_col, base + last_col))
+
+    ranges.sort()
+    merged: list[tuple[int, int]] = []
+    for lo, hi in ranges:
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+# ---------------------------------------------------------
+# Polygones GeoJSON
+# ---------------------------------------------------------
+
+class PolygonFilter:
+    """Polygone / MultiPolygon GeoJSON préparé pour des tests en masse.
+
+    Les trous sont gérés par la règle pair-impair sur tous les anneaux.
+    """
+
+    def __init__(self, polygons: list[list[list[tuple[float, float]]]]):
+        # Un anneau traverse l'antiméridien si l'une de ses arêtes (fermeture
+        # comprise) saute de plus de 180° : être large ne suffit pas
+        self.unwrap = any(
+            abs(b[0] - a[0]) > 180.0
+            for poly in polygons
+            for ring in poly
+            for a, b in zip(ring, ring[1:] + ring[:1])
+        )
+        self.edges: list[tuple[float, float, float, float]] = []
+
+        for poly in polygons:
+            for ring in poly:
+                pts = [(self._lng(lng), lat) for lng, lat in ring]
+                if len(pts) < 3:
+                    continue
+                if pts[0] != pts[-1]:
+                    pts.append(pts[0])
+                for (x1, y1), (x2, y2) in zip(pts, pts[1:]):
+                    if y1 != y2:
+                        self.edges.append((x1, y1, x2, y2))
+
+        if not self.edges:
+            raise ValueError("Polygone vide")
+
+        xs = [x for e in self.edges for x in (e[0], e[2])]
+        ys = [y for e in self.edges for y in (e[1], e[3])]
+        self.min_lng, self.max_lng = min(xs), max(xs)
+        self.min_lat, self.max_lat = min(ys), max(ys)
+
+    def _lng(self, lng: float) -> float:
+        return lng + 360.0 if self.unwrap and lng < 0 else lng
+
+    @classmethod
+    def from_geojson(cls, obj: dict[str, Any]) -> "PolygonFilter":
+        """Accepte une geometry Polygon / MultiPolygon, ou une Feature."""
+        if obj.get("type") == "Feature":
+            obj = obj.get("geometry") or {}
+
+        kind = obj.get("type")
+        coords = obj.get("coordinates")
+        if kind == "Polygon":
+            raw = [coords]
+        elif kind == "MultiPolygon":
+            raw = coords
+        else:
+            raise ValueError(f"Géométrie non supportée : {kind}")
+
+        try:
+            polygons = [
+                [[(float(p[0]), float(p[1])) for p in ring] for ring in poly]
+                for poly in raw
+            ]
+        except (TypeError, IndexError, ValueError):
+            raise ValueError("Coordonnées GeoJSON invalides")
+        return cls(polygons)
+
+    def bboxes(self) -> list[tuple[float, float, float, float]]:
+        """Bbox englobante(s) en coordonnées [-180, 180]."""
+        west = self.min_lng - 360.0 if self.min_lng > 180.0 else self.min_lng
+        east = self.max_lng - 360.0 if self.max_lng > 180.0 else self.max_lng
+        if self.max_lng - self.min_lng >= 360.0:
+            west, east = -180.0, 180.0
+        return split_bbox(west, self.min_lat, east, self.max_lat)
+
+    def contains_many(self, lats: list[float], lngs: list[float]) -> list[bool]:
+        """Test point-dans-polygone (pair-impair) sur tout un lot de points.
+
+        Les points sont triés une fois par latitude ; chaque arête ne
+        bascule alors que la tranche de points de sa bande de latitude
+        (bisect), au lieu de tester tous les points contre toutes les arêtes.
+        """
+        xs = [self._lng(x) for x in lngs]
+        inside = [False] * len(lats)
+        order = sorted(range(len(lats)), key=lats.__getitem__)
+        sorted_lats = [lats[i] for i in order]
+
+        for x1, y1, x2, y2 in self.edges:
+            lo, hi = (y1, y2) if y1 < y2 else (y2, y1)
+            slope = (x2 - x1) / (y2 - y1)
+            start = bisect_left(sorted_lats, lo)
+            stop = bisect_left(sorted_lats, hi, start)
+            for i in order[start:stop]:
+                if xs[i] < x1 + (lats[i] - y1) * slope:
+                    inside[i] = not inside[i]
+        return inside
@@ -1,13 +1,26 @@
 # ecoatlas_api/services/species_loader.py
+"""
+Chargement de species_base.json dans species + occurrences.
+
+- reload_species_database : vide tout et recharge (bulk_loader) ;
+- sync_species_database : rechargement incrémental. Chaque enregistrement
+  du fichier a une clé stable (source_key) et un hash de son contenu
+  (content_hash) ; seuls les enregistrements nouveaux, modifiés ou
+  disparus touchent la base. Les ids et les colonnes d'enrichissement
+  (photo_url, tailles, poids…) des espèces existantes sont conservés.
+"""
 
-import json
 import random
 from pathlib import Path
 
+from sqlalchemy import func, update
+
 from ..database import SessionLocal
 from .. import models
+from . import bulk_loader, data_version
+from .seed_snapshot import DATA_PATH, SeedRecord, load_seed
 
-DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "species_base.json"
+DELETE_BATCH = 500
 
 
 def random_years(seed: str):
@@ -17,46 +30,188 @@ def random_years(seed: str):
     return start, end
 
 
-def reload_species_database() -> int:
-    db = SessionLocal()
+# ---------------------------------------------------------
+# Enregistrements du fichier source (cf. seed_snapshot)
+# ---------------------------------------------------------
+
+def record_key(rec: SeedRecord, source: str = DATA_PATH.stem) -> str:
+    """Clé stable d'un enregistrement : son id dans le fichier, sinon son nom."""
+    ident = rec.id if rec.id is not None else rec.scientific_name
+    return f"{source}:{ident}"
+
+
+def _species_row(rec: SeedRecord, source: str) -> dict:
+    return {
+        "common_name": rec.common_name,
+        "scientific_name": rec.scientific_name,
+        "life_zone": rec.life_zone,
+        "biome": rec.biome,
+        "source_key": record_key(rec, source),
+        "content_hash": rec.content_hash,
+    }
+
+
+def _occurrence_rows(pairs):
+    """(species_id, enregistrement) -> tuples bulk_loader.OCCURRENCE_INPUT.
+    Les années dépendent de l'id : elles restent stables tant que l'id l'est."""
+    for species_id, rec in pairs:
+        for idx, (lat, lng) in enumerate(zip(rec.lats, rec.lngs)):
+            yield (species_id, lat, lng, *random_years(f"{species_id}:{idx}"), "MANUAL")
 
-    # wipe tables
-    db.query(models.Occurrence).delete()
-    db.query(models.Species).delete()
-    db.commit()
 
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
+# ---------------------------------------------------------
+# Rechargement complet
+# ---------------------------------------------------------
 
-    count = 0
+def reload_species_database(path: Path = DATA_PATH) -> int:
+    """Remplace tout le catalogue par le fichier (une transaction)."""
+    data = load_seed(path)
 
-    for sp in data:
-        species = models.Species(
-            common_name=sp["common_name"],
-            scientific_name=sp["scientific_name"],
-            life_zone=sp.get("life_zone"),
-            biome=sp.get("biome"),
-        )
-        db.add(species)
+    db = SessionLocal()
+    try:
+        bulk_loader.clear_catalog(db)
+
+        ids = bulk_loader.insert_species(db, [_species_row(sp, path.stem) for sp in data])
+        with bulk_loader.deferred_indexes(db, models.Occurrence):
+            bulk_loader.insert_occurrences(db, _occurrence_rows(zip(ids, data)))
         db.commit()
-        db.refresh(species)
-
-        for idx, o in enumerate(sp["occurrences"]):
-            start, end = random_years(f"{species.id}:{idx}")
-
-            db.add(
-                models.Occurrence(
-                    species_id=species.id,
-                    lat=float(o["lat"]),
-                    lng=float(o["lng"]),
-                    start_year=start,
-                    end_year=end,
-                    source="MANUAL",
-                )
-            )
+    finally:
+        db.close()
+
+    data_version.bump()
+    return len(ids)
+
+
+# ---------------------------------------------------------
+# Rechargement incrémental
+# ---------------------------------------------------------
+
+def _adopt_legacy_rows(db, records: dict[str, SeedRecord], source: str) -> int:
+    """Donne une source_key aux espèces chargées avant son introduction.
+
+    L'ancien chargeur insérait dans l'ordre du fichier : on apparie, dans
+    l'ordre des ids, les lignes sans clé aux enregistrements de même nom.
+    Ses années d'occurrences dépendaient déjà de (id, rang) : si le nombre
+    d'occurrences correspond, la ligne reçoit aussi le content_hash et ses
+    occurrences sont gardées telles quelles ; sinon son content_hash reste
+    vide et elle sera réécrite une fois.
+    """
+    legacy = (
+        db.query(models.Species.id, models.Species.common_name, models.Species.scientific_name)
+        .filter(models.Species.source_key.is_(None), models.Species.gbif_id.is_(None))
+        .order_by(models.Species.id)
+        .all()
+    )
+    if not legacy:
+        return 0
+
+    taken = {
+        k for (k,) in db.query(models.Species.source_key)
+        .filter(models.Species.source_key.like(f"{source}:%"))
+    }
+    free: dict[tuple, list[str]] = {}
+    for key, sp in records.items():
+        if key not in taken:
+            free.setdefault((sp.common_name, sp.scientific_name), []).append(key)
+
+    occ_counts = dict(
+        db.query(models.Occurrence.species_id, func.count(models.Occurrence.id))
+        .join(models.Species, models.Species.id == models.Occurrence.species_id)
+        .filter(models.Species.source_key.is_(None), models.Species.gbif_id.is_(None))
+        .group_by(models.Occurrence.species_id)
+    )
+
+    adopted = []
+    for row in legacy:
+        keys = free.get((row.common_name, row.scientific_name))
+        if not keys:
+            continue
+        key = keys.pop(0)
+        rec = records[key]
+        if occ_counts.get(row.id, 0) == len(rec.lats):
+            adopted.append({"id": row.id, **_species_row(rec, source)})
+        else:
+            adopted.append({"id": row.id, "source_key": key})
+
+    if adopted:
+        db.execute(update(models.Species), adopted)
+    return len(adopted)
+
+
+def _delete_occurrences(db, species_ids: list[int]) -> None:
+    for i in range(0, len(species_ids), DELETE_BATCH):
+        batch = species_ids[i:i + DELETE_BATCH]
+        db.query(models.Occurrence).filter(
+            models.Occurrence.species_id.in_(batch)
+        ).delete(synchronize_session=False)
+
+
+def _delete_species(db, species_ids: list[int]) -> None:
+    _delete_occurrences(db, species_ids)
+    for i in range(0, len(species_ids), DELETE_BATCH):
+        batch = species_ids[i:i + DELETE_BATCH]
+        db.query(models.Species).filter(
+            models.Species.id.in_(batch)
+        ).delete(synchronize_session=False)
+
+
+def sync_species_database(path: Path = DATA_PATH) -> dict:
+    """Applique au catalogue les seuls changements du fichier ; renvoie
+    {species, inserted, updated, deleted, unchanged, adopted}."""
+    source = path.stem
+    records: dict[str, SeedRecord] = {}
+    for sp in load_seed(path):
+        key = record_key(sp, source)
+        if key in records:
+            raise ValueError(f"Clé dupliquée dans {path.name} : {key}")
+        records[key] = sp
+
+    db = SessionLocal()
+    try:
+        adopted = _adopt_legacy_rows(db, records, source)
+
+        existing = {
+            key: (species_id, content_hash)
+            for species_id, key, content_hash in db.query(
+                models.Species.id, models.Species.source_key, models.Species.content_hash
+            ).filter(models.Species.source_key.like(f"{source}:%"))
+        }
+
+        new_keys = [k for k in records if k not in existing]
+        changed = [
+            (species_id, records[key])
+            for key, (species_id, content_hash) in existing.items()
+            if key in records and content_hash != records[key].content_hash
+        ]
+        deleted_ids = [species_id for key, (species_id, _) in existing.items() if key not in records]
+
+        if deleted_ids:
+            _delete_species(db, deleted_ids)
+
+        if changed:
+            rows = [{"id": species_id, **_species_row(sp, source)} for species_id, sp in changed]
+            db.execute(update(models.Species), rows)
+            # Occurrences d'une espèce modifiée : remplacées en bloc
+            _delete_occurrences(db, [species_id for species_id, _ in changed])
+            bulk_loader.insert_occurrences(db, _occurrence_rows(changed))
+
+        if new_keys:
+            new_records = [records[k] for k in new_keys]
+            ids = bulk_loader.insert_species(db, [_species_row(sp, source) for sp in new_records])
+            bulk_loader.insert_occurrences(db, _occurrence_rows(zip(ids, new_records)))
 
         db.commit()
-        count += 1
+    finally:
+        db.close()
 
-    db.close()
-    return count
+    stats = {
+        "species": len(records),
+        "inserted": len(new_keys),
+        "updated": len(changed),
+        "deleted": len(deleted_ids),
+        "unchanged": len(existing) - len(changed) - len(deleted_ids),
+        "adopted": adopted,
+    }
+    if new_keys or changed or deleted_ids:
+        data_version.bump()
+    return stats
@@ -0,0 +1,129 @@
+# ecoatlas_api/services/suggest_index.py
+"""
+Autocomplétion en mémoire (sans requête SQL) pour la barre de recherche.
+
+Tableau trié de suffixes "début de mot" des noms pliés (cf. search_index.fold),
+parcouru par bisect. Chaque entrée est un entier 64 bits
+(indice du nom << 8 | position du mot) : on ne stocke pas de sous-chaînes.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from .search_index import fold
+from . import data_version
+
+# Budget mémoire : au-delà, on n'indexe plus que les débuts de nom
+SUGGEST_MAX_ENTRIES = 500_000
+# Nombre max d'entrées examinées par requête (avant classement)
+SUGGEST_SCAN_LIMIT = 200
+
+_index: "SuggestIndex | None" = None
+_lock = threading.Lock()
+
+
+class SuggestIndex:
+    def __init__(self, docs: list[tuple[int, str | None, str | None]]):
+        self.texts: list[str] = []
+        owners = []
+        self.labels: dict[int, tuple[str | None, str | None]] = {}
+
+        for sid, common, scientific in sorted(docs):
+            self.labels[sid] = (common, scientific)
+            for name in (fold(common), fold(scientific)):
+                if name:
+                    self.texts.append(name)
+                    owners.append(sid)
+        self.owners = array("I", owners)
+
+        entries = [i << 8 for i in range(len(self.texts))]
+        words = [
+            i << 8 | pos
+            for i, text in enumerate(self.texts)
+            for pos in range(1, min(len(text), 256))
+            if text[pos - 1] == " "
+        ]
+        self.word_entries = len(entries) + len(words) <= SUGGEST_MAX_ENTRIES
+        if self.word_entries:
+            entries.extend(words)
+
+        entries.sort(key=self._suffix)
+        self.entries = array("Q", entries)
+
+    def _suffix(self, entry: int) -> str:
+        return self.texts[entry >> 8][entry & 0xFF:]
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[tuple[int, str | None, str | None]]:
+        """Top-k (id, nom commun, nom scientifique) dont un mot commence par prefix.
+
+        Les débuts de nom passent avant les débuts de mot, puis les noms
+        les plus courts ; les libellés identiques ne sont renvoyés qu'une fois.
+        """
+        p = fold(prefix)
+        if not p:
+            return []
+
+        hits = []
+        i = bisect_left(self.entries, p, key=self._suffix)
+        while i < len(self.entries) and len(hits) < SUGGEST_SCAN_LIMIT:
+            entry = self.entries[i]
+            if not self._suffix(entry).startswith(p):
+                break
+            text_idx, pos = entry >> 8, entry & 0xFF
+            hits.append((pos > 0, len(self.texts[text_idx]), self.texts[text_idx], self.owners[text_idx]))
+            i += 1
+        hits.sort()
+
+        out, seen_ids, seen_labels = [], set(), set()
+        for _, _, _, sid in hits:
+            label = self.labels[sid]
+            if sid in seen_ids or label in seen_labels:
+                continue
+            seen_ids.add(sid)
+            seen_labels.add(label)
+            out.append((sid, *label))
+            if len(out) >= limit:
+                break
+        return out
+
+
+# ---------------------------------------------------------
+# Construction / cache
+# ---------------------------------------------------------
+
+def build_suggest_index(db: Session) -> SuggestIndex:
+    docs = db.query(
+        models.Species.id,
+        models.Species.common_name,
+        models.Species.scientific_name,
+    ).all()
+    return SuggestIndex([tuple(d) for d in docs])
+
+
+def get_suggest_index() -> SuggestIndex:
+    global _index
+    index = _index
+    if index is not None:
+        return index
+    with _lock:
+        if _index is None:
+            db = SessionLocal()
+            try:
+                _index = build_suggest_index(db)
+            finally:
+                db.close()
+        return _index
+
+
+@data_version.on_change
+def invalidate_suggest_index() -> None:
+    global _index
+    with _lock:
+        _index = None
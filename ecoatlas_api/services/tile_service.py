@@ -0,0 +1,146 @@
+# ecoatlas_api/services/tile_service.py
+"""
+Tuiles d'occurrences agrégées pour la carte (clusters).
+
+Une tuile XYZ (Web Mercator, comme les fonds de carte) est découpée en
+une grille fixe de TILE_GRID_SIZE x TILE_GRID_SIZE cellules ; chaque
+cellule non vide renvoie un compte + un centroïde. La taille de la
+réponse est donc bornée quel que soit le nombre d'occurrences.
+
+Le cache garde des tuples compacts (pas d'objets pydantic), borné par
+le nombre total de clusters en plus du nombre de tuiles ; le JSON est
+produit à la réponse (fast_json).
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..fast_json import rows_to_dicts
+from . import data_version
+
+TILE_GRID_SIZE = 32      # => 1024 clusters max par tuile
+TILE_CACHE_SIZE = 2048   # nombre de tuiles gardées en mémoire
+TILE_CACHE_CLUSTERS = 200_000   # clusters gardés au total (~25 Mo)
+CLUSTER_FIELDS = ("lat", "lng", "count", "species_count")
+MAX_ZOOM = 22
+MAX_MERCATOR_LAT = 85.0511287798
+
+# clé -> (total, ((lat, lng, count, species_count), ...))
+_cache: "OrderedDict[tuple, tuple[int, tuple]]" = OrderedDict()
+_cached_clusters = 0
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------
+# Géométrie des tuiles
+# ---------------------------------------------------------
+
+def _tile_lat(y: int, n: int) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """Renvoie (west, south, east, north) en degrés pour la tuile z/x/y."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = _tile_lat(y, n)
+    south = _tile_lat(y + 1, n)
+    return west, south, east, north
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    if z < 0 or z > MAX_ZOOM:
+        return False
+    n = 2 ** z
+    return 0 <= x < n and 0 <= y < n
+
+
+# ---------------------------------------------------------
+# Cache LRU
+# ---------------------------------------------------------
+
+@data_version.on_change
+def clear_tile_cache() -> None:
+    """Appelée à chaque changement du catalogue (cf. data_version)."""
+    global _cached_clusters
+    with _lock:
+        _cache.clear()
+        _cached_clusters = 0
+
+
+def _cache_get(key: tuple):
+    with _lock:
+        tile = _cache.get(key)
+        if tile is not None:
+            _cache.move_to_end(key)
+        return tile
+
+
+def _cache_put(key: tuple, tile: tuple[int, tuple]) -> None:
+    global _cached_clusters
+    with _lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cached_clusters -= len(old[1])
+        _cache[key] = tile
+        _cached_clusters += len(tile[1])
+        while len(_cache) > TILE_CACHE_SIZE or _cached_clusters > TILE_CACHE_CLUSTERS:
+            _, evicted = _cache.popitem(last=False)
+            _cached_clusters -= len(evicted[1])
+
+
+# ---------------------------------------------------------
+# Construction d'une tuile
+# ---------------------------------------------------------
+
+def _tile_payload(z: int, x: int, y: int, tile: tuple[int, tuple]) -> dict:
+    """Même JSON que schemas.OccurrenceTile."""
+    total, clusters = tile
+    return {"z": z, "x": x, "y": y, "total": total, "clusters": rows_to_dicts(clusters, CLUSTER_FIELDS)}
+
+
+def get_tile(
+    db: Session,
+    z: int,
+    x: int,
+    y: int,
+    species_id: int | None = None,
+    from_year: int | None = None,
+    to_year: int | None = None,
+    biome: str | None = None,
+) -> dict:
+    key = (z, x, y, species_id, from_year, to_year, biome)
+    cached = _cache_get(key)
+    if cached is not None:
+        return _tile_payload(z, x, y, cached)
+
+    west, south, east, north = tile_bounds(z, x, y)
+    rows = crud.get_occurrence_clusters(
+        db,
+        west=west,
+        south=south,
+        east=east,
+        north=north,
+        grid_size=TILE_GRID_SIZE,
+        species_id=species_id,
+        from_year=from_year,
+        to_year=to_year,
+        biome=biome,
+    )
+
+    clusters = tuple(sorted(
+        (
+            (sum_lat / count, sum_lng / count, count, species_count)
+            for _col, _row, count, sum_lat, sum_lng, species_count in rows
+        ),
+        key=lambda c: c[2],
+        reverse=True,
+    ))
+    tile = (sum(c[2] for c in clusters), clusters)
+    _cache_put(key, tile)
+    return _tile_payload(z, x, y, tile)
@@ -0,0 +1,192 @@
+# ecoatlas_api/services/timeline_service.py
+"""
+Histogramme "espèces / occurrences actives par année" pour la frise
+sous le slider.
+
+Calculé en une passe de balayage (sweep-line) sur les intervalles
+[start_year, end_year] des occurrences, lues en flux espèce par espèce,
+puis gardé en mémoire jusqu'au prochain rechargement des données.
+"""
+
+from __future__ import annotations
+
+import threading
+from itertools import accumulate
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from .year_index import merge_intervals, stream_by_species
+from . import data_version
+
+GROUP_FIELDS = ("biome", "life_zone")
+UNKNOWN_GROUP = "inconnu"
+MAX_SPAN_YEARS = 1000
+
+_timeline: "TimelineData | None" = None
+_lock = threading.Lock()
+
+
+class _Sweep:
+    """Compteurs d'événements +1 / -1 sur [min_year, max_year + 1]."""
+
+    def __init__(self, min_year: int, max_year: int):
+        self.min_year = min_year
+        self.species = [0] * (max_year - min_year + 2)
+        self.occurrences = [0] * (max_year - min_year + 2)
+
+    def add_occurrence(self, start: int, end: int) -> None:
+        self.occurrences[start - self.min_year] += 1
+        self.occurrences[end - self.min_year + 1] -= 1
+
+    def add_species(self, start: int, end: int) -> None:
+        self.species[start - self.min_year] += 1
+        self.species[end - self.min_year + 1] -= 1
+
+    def counts(self) -> tuple[list[int], list[int]]:
+        return (
+            list(accumulate(self.species[:-1])),
+            list(accumulate(self.occurrences[:-1])),
+        )
+
+
+class TimelineData:
+    def __init__(self, min_year: int | None, totals, groups):
+        self.min_year = min_year
+        self.totals = totals  # (species_counts, occurrence_counts)
+        self.groups = groups  # {field: {valeur: (species_counts, occurrence_counts)}}
+
+    def points(self, counts, from_year: int, to_year: int) -> list[schemas.TimelinePoint]:
+        species_counts, occ_counts = counts
+        out = []
+        for year in range(from_year, to_year + 1):
+            i = year - self.min_year if self.min_year is not None else -1
+            inside = 0 <= i < len(species_counts)
+            out.append(
+                schemas.TimelinePoint(
+                    year=year,
+                    species_count=species_counts[i] if inside else 0,
+                    occurrence_count=occ_counts[i] if inside else 0,
+                )
+            )
+        return out
+
+
+# ---------------------------------------------------------
+# Construction (une seule passe)
+# ---------------------------------------------------------
+
+def build_timeline(db: Session) -> TimelineData:
+    dated = (
+        models.Occurrence.start_year.isnot(None),
+        models.Occurrence.end_year.isnot(None),
+        models.Occurrence.start_year <= models.Occurrence.end_year,
+    )
+    # Bornes d'abord (agrégat SQL), pour dimensionner les balayages
+    min_year, max_year = (
+        db.query(func.min(models.Occurrence.start_year), func.max(models.Occurrence.end_year))
+        .join(models.Species, models.Species.id == models.Occurrence.species_id)
+        .filter(*dated)
+        .one()
+    )
+    if min_year is None:
+        return TimelineData(None, ([], []), {f: {} for f in GROUP_FIELDS})
+
+    totals = _Sweep(min_year, max_year)
+    groups: dict[str, dict[str, _Sweep]] = {f: {} for f in GROUP_FIELDS}
+
+    rows = (
+        db.query(
+            models.Occurrence.species_id,
+            models.Occurrence.start_year,
+            models.Occurrence.end_year,
+            models.Species.biome,
+            models.Species.life_zone,
+        )
+        .join(models.Species, models.Species.id == models.Occurrence.species_id)
+        .filter(*dated)
+        .order_by(models.Occurrence.species_id)
+    )
+    for _sid, species_rows in stream_by_species(rows):
+        # biome / life_zone viennent de Species : identiques pour toutes les lignes
+        keys = {f: getattr(species_rows[0], f) or UNKNOWN_GROUP for f in GROUP_FIELDS}
+        sweeps = [totals]
+        for f, key in keys.items():
+            sweep = groups[f].get(key)
+            if sweep is None:
+                sweep = groups[f][key] = _Sweep(min_year, max_year)
+            sweeps.append(sweep)
+
+        for r in species_rows:
+            for sweep in sweeps:
+                sweep.add_occurrence(r.start_year, r.end_year)
+
+        # Une espèce compte une seule fois par année : on fusionne ses intervalles.
+        for start, end in merge_intervals([(r.start_year, r.end_year) for r in species_rows]):
+            for sweep in sweeps:
+                sweep.add_species(start, end)
+
+    return TimelineData(
+        min_year,
+        totals.counts(),
+        {f: {k: s.counts() for k, s in g.items()} for f, g in groups.items()},
+    )
+
+
+# ---------------------------------------------------------
+# Accès (avec cache)
+# ---------------------------------------------------------
+
+def get_timeline_data(db: Session) -> TimelineData:
+    global _timeline
+    data = _timeline
+    if data is not None:
+        return data
+    with _lock:
+        if _timeline is None:
+            _timeline = build_timeline(db)
+        return _timeline
+
+
+@data_version.on_change
+def invalidate_timeline() -> None:
+    global _timeline
+    with _lock:
+        _timeline = None
+
+
+def get_timeline(
+    db: Session,
+    from_year: int | None = None,
+    to_year: int | None = None,
+    group_by: str | None = None,
+) -> schemas.Timeline:
+    data = get_timeline_data(db)
+    if data.min_year is None:
+        return schemas.Timeline(from_year=from_year, to_year=to_year, points=[])
+
+    data_max = data.min_year + len(data.totals[0]) - 1
+    if from_year is None:
+        from_year = data.min_year if to_year is None else min(data.min_year, to_year)
+    if to_year is None:
+        to_year = max(data_max, from_year)
+    # Après les valeurs par défaut : une seule borne peut aussi être démesurée
+    if from_year > to_year:
+        raise ValueError("from_year doit être <= to_year")
+    if to_year - from_year > MAX_SPAN_YEARS:
+        raise ValueError(f"Intervalle trop large ({MAX_SPAN_YEARS} ans max)")
+
+    breakdown = None
+    if group_by:
+        breakdown = {
+            key: data.points(counts, from_year, to_year)
+            for key, counts in sorted(data.groups[group_by].items())
+        }
+
+    return schemas.Timeline(
+        from_year=from_year,
+        to_year=to_year,
+        points=data.points(data.totals, from_year, to_year),
+        breakdown=breakdown,
+    )
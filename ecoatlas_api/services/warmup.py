@@ -0,0 +1,47 @@
+# ecoatlas_api/services/warmup.py
+"""
+Préchauffage optionnel (WARMUP=1) au démarrage.
+
+Sur l'offre gratuite de Render, l'instance est réveillée par la première
+requête : sans préchauffage, c'est elle qui paie la construction des
+index en mémoire et l'ouverture des connexions. Ici on les construit
+dans un thread pendant le lifespan ; GET /ready ne passe à 200 qu'une
+fois terminé. Une étape qui échoue est signalée puis ignorée.
+"""
+
+import os
+
+from .. import crud
+from ..database import SessionLocal
+from ..startup_timing import phase
+from . import data_version
+from .search_index import get_search_index
+from .suggest_index import get_suggest_index
+from .timeline_service import get_timeline_data
+from .year_index import get_year_index
+
+ENABLED = os.getenv("WARMUP", "0").lower() in ("1", "true", "yes")
+
+FIRST_PAGE_SIZE = 50
+
+
+def run_warmup() -> None:
+    steps = [
+        ("warmup.data_version", lambda db: data_version.refresh()),
+        ("warmup.species_page", lambda db: crud.get_species_list(db, limit=FIRST_PAGE_SIZE)),
+        ("warmup.search_index", get_search_index),
+        ("warmup.suggest_index", lambda db: get_suggest_index()),
+        ("warmup.year_index", get_year_index),
+        ("warmup.timeline", get_timeline_data),
+    ]
+    db = SessionLocal()
+    try:
+        for name, step in steps:
+            try:
+                with phase(name):
+                    step(db)
+            except Exception as e:
+                db.rollback()
+                print(f"[WARN] Warm-up step {name} failed: {e}")
+    finally:
+        db.close()
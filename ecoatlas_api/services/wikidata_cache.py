@@ -0,0 +1,244 @@
+# ecoatlas_api/services/wikidata_cache.py
+"""
+Cache des données Wikidata, à deux niveaux :
+
+1. un LRU en mémoire (par worker) ;
+2. la table wikidata_cache, partagée et persistante (survit aux
+   redémarrages de l'instance Render free).
+
+Chaque entrée a une date d'expiration : longue pour un résultat, courte
+pour "introuvable", très courte pour une erreur réseau (on ne fige plus
+jamais un échec transitoire). Une entrée expirée mais valide est servie
+telle quelle pendant qu'une tâche asyncio la rafraîchit
+(stale-while-revalidate).
+
+Les accès base (sync) passent par asyncio.to_thread, chacun avec sa
+propre session courte : aucune connexion n'est gardée pendant l'attente
+de Wikidata.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from .singleflight import SingleFlight
+from .wikidata_service import WikidataUnavailable, lookup_wikidata
+
+TTL_OK = timedelta(days=30)
+TTL_MISSING = timedelta(days=1)
+TTL_ERROR = timedelta(minutes=5)
+LRU_SIZE = 1000
+
+_lru: "OrderedDict[str, CachedEntry]" = OrderedDict()
+_lru_lock = threading.Lock()
+_revalidating: set[str] = set()
+_tasks: set[asyncio.Task] = set()
+# Un seul appel Wikidata en cours par nom, quel que soit le nombre d'appelants
+_flight = SingleFlight()
+
+
+@dataclass
+class CachedEntry:
+    status: str
+    qid: str | None
+    data: dict | None
+    expires_at: datetime
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > _utcnow()
+
+
+def _utcnow() -> datetime:
+    # Dates naïves en UTC (SQLite ne stocke pas le fuseau)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ---------------------------------------------------------
+# LRU en mémoire
+# ---------------------------------------------------------
+
+def _lru_get(name: str) -> CachedEntry | None:
+    with _lru_lock:
+        entry = _lru.get(name)
+        if entry is not None:
+            _lru.move_to_end(name)
+        return entry
+
+
+def _lru_put(name: str, entry: CachedEntry) -> None:
+    with _lru_lock:
+        _lru[name] = entry
+        _lru.move_to_end(name)
+        while len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def clear_memory_cache() -> None:
+    with _lru_lock:
+        _lru.clear()
+
+
+# ---------------------------------------------------------
+# Table wikidata_cache
+# ---------------------------------------------------------
+
+def _load(db: Session, name: str) -> CachedEntry | None:
+    row = (
+        db.query(models.WikidataCache)
+        .filter(models.WikidataCache.scientific_name == name)
+        .first()
+    )
+    if row is None:
+        return None
+    data = json.loads(row.payload) if row.payload else None
+    return CachedEntry(row.status, row.qid, data, row.expires_at)
+
+
+def store(
+    db: Session,
+    name: str,
+    status: str,
+    qid: str | None,
+    data: dict | None,
+    commit: bool = True,
+    ttl: timedelta | None = None,
+) -> CachedEntry:
+    """Écrit (ou remplace) l'entrée en base et dans le LRU.
+
+    commit=False : l'appelant regroupe plusieurs écritures dans sa transaction.
+    ttl : durée de validité, sinon celle du statut.
+    """
+    now = _utcnow()
+    if ttl is None:
+        ttl = {"ok": TTL_OK, "missing": TTL_MISSING}.get(status, TTL_ERROR)
+    entry = CachedEntry(status, qid, data, now + ttl)
+    values = {
+        "status": status,
+        "qid": qid,
+        "payload": json.dumps(data) if data is not None else None,
+        "fetched_at": now,
+        "expires_at": entry.expires_at,
+    }
+
+    try:
+        updated = (
+            db.query(models.WikidataCache)
+            .filter(models.WikidataCache.scientific_name == name)
+            .update(values, synchronize_session=False)
+        )
+        if not updated:
+            db.add(models.WikidataCache(scientific_name=name, **values))
+        if commit:
+            db.commit()
+    except IntegrityError:
+        # Un autre worker vient d'insérer la même clé : sa valeur fait foi.
+        db.rollback()
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+
+    _lru_put(name, entry)
+    return entry
+
+
+# ---------------------------------------------------------
+# Récupération
+# ---------------------------------------------------------
+
+def _in_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def _store(
+    name: str, status: str, qid: str | None, data: dict | None, ttl: timedelta | None = None
+) -> CachedEntry:
+    return await asyncio.to_thread(_in_session, store, name, status, qid, data, True, ttl)
+
+
+async def _fetch(name: str, stale: CachedEntry | None) -> CachedEntry:
+    return await _flight.do_async(name, _fetch_uncoalesced, name, stale)
+
+
+async def _fetch_uncoalesced(name: str, stale: CachedEntry | None) -> CachedEntry:
+    try:
+        qid, data = await lookup_wikidata(name)
+    except WikidataUnavailable:
+        if stale is not None and stale.status == "ok":
+            # On garde la dernière bonne valeur, mais pour TTL_ERROR seulement :
+            # la prochaine requête réessaiera bientôt
+            return await _store(name, "ok", stale.qid, stale.data, ttl=TTL_ERROR)
+        return await _store(name, "error", None, None)
+
+    return await _store(name, "ok" if data else "missing", qid, data)
+
+
+async def _revalidate(name: str, stale: CachedEntry) -> None:
+    try:
+        await _fetch(name, stale)
+    except Exception as e:
+        print(f"[WARN] Wikidata revalidation failed for {name!r}: {e}")
+    finally:
+        _revalidating.discard(name)
+
+
+def _schedule_revalidation(name: str, stale: CachedEntry) -> None:
+    if name in _revalidating:
+        return
+    _revalidating.add(name)
+    task = asyncio.create_task(_revalidate(name, stale))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _cached_entry(name: str) -> CachedEntry | None:
+    entry = _lru_get(name)
+    if entry is None:
+        entry = await asyncio.to_thread(_in_session, _load, name)
+        if entry is not None:
+            _lru_put(name, entry)
+    return entry
+
+
+async def peek_wikidata(scientific_name: str | None) -> dict | None:
+    """Comme get_wikidata, mais sans jamais attendre Wikidata : None si
+    rien n'est en cache (une entrée périmée est servie et rafraîchie)."""
+    if not scientific_name:
+        return None
+
+    entry = await _cached_entry(scientific_name)
+    if entry is None or entry.status != "ok":
+        return None
+    if not entry.fresh:
+        _schedule_revalidation(scientific_name, entry)
+    return entry.data
+
+
+async def get_wikidata(scientific_name: str | None) -> dict | None:
+    """Données Wikidata parsées (cf. wikidata_service.parse_entity) ou None."""
+    if not scientific_name:
+        return None
+
+    entry = await _cached_entry(scientific_name)
+    if entry is not None:
+        if entry.fresh:
+            return entry.data
+        if entry.status == "ok":
+            _schedule_revalidation(scientific_name, entry)
+            return entry.data
+
+    return (await _fetch(scientific_name, entry)).data
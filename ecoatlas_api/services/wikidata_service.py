@@ -2,46 +2,108 @@
 """
 Wikidata BIO fetcher
 Convertit une espèce (nom scientifique) en infos bio complètes.
-Ultra simplifié + cache interne pour vitesse.
+Ultra simplifié ; le cache est géré par services/wikidata_cache.py.
+Appels async via le client HTTP partagé (services/http_client.py).
 """
 
+import os
+
 import httpx
-from functools import lru_cache
 
-WIKIDATA_API = "https://www.wikidata.org/wiki/Special:EntityData/"
+from .http_client import get_async_client
+
+# Surchargeable (ex : serveur stub local pour les tests)
+WIKIDATA_BASE_URL = os.getenv("WIKIDATA_BASE_URL", "https://www.wikidata.org")
+WIKIDATA_SEARCH_API = f"{WIKIDATA_BASE_URL}/w/api.php"
+WIKIDATA_API = f"{WIKIDATA_BASE_URL}/wiki/Special:EntityData/"
+WIKIMEDIA_BASE_URL = os.getenv("WIKIMEDIA_BASE_URL", "https://commons.wikimedia.org")
+WIKIMEDIA_API = f"{WIKIMEDIA_BASE_URL}/w/api.php"
+
+COMMONS_TITLES_BATCH = 50   # maximum de titles= par requête
 
 
-@lru_cache(maxsize=500)
-def fetch_wikidata(scientific_name: str | None):
-    if not scientific_name:
-        return None
+class WikidataUnavailable(Exception):
+    """Erreur réseau / HTTP : l'absence de résultat n'est pas définitive."""
 
-    # 1. Rechercher l’ID Wikidata
-    search_url = (
-        "https://www.wikidata.org/w/api.php"
-        "?action=wbsearchentities"
-        "&language=en"
-        "&format=json"
-        f"&search={scientific_name}"
-    )
 
+# ---------------------------------------------------------
+# Appels HTTP
+# ---------------------------------------------------------
+
+async def search_qid(scientific_name: str) -> str | None:
+    """Rechercher l’ID Wikidata (ex "Q140"), None si aucun résultat."""
+    params = {
+        "action": "wbsearchentities",
+        "language": "en",
+        "format": "json",
+        "search": scientific_name,
+    }
     try:
-        res = httpx.get(search_url, timeout=5)
-        data = res.json()
-        hits = data.get("search", [])
-        if not hits:
-            return None
-        qid = hits[0]["id"]
-    except Exception:
-        return None
+        res = await get_async_client().get(WIKIDATA_SEARCH_API, params=params, timeout=5)
+        res.raise_for_status()
+        hits = res.json().get("search", [])
+    except (httpx.HTTPError, ValueError) as e:
+        raise WikidataUnavailable(str(e))
 
-    # 2. Récupérer les données de l'entité
+    return hits[0]["id"] if hits else None
+
+
+async def fetch_entity(qid: str) -> dict | None:
+    """Récupérer les données brutes de l'entité."""
     try:
-        r2 = httpx.get(f"{WIKIDATA_API}{qid}.json", timeout=8)
-        entity = list(r2.json()["entities"].values())[0]
-        claims = entity.get("claims", {})
-    except Exception:
-        return None
+        r2 = await get_async_client().get(f"{WIKIDATA_API}{qid}.json", timeout=8)
+        r2.raise_for_status()
+        entities = r2.json().get("entities") or {}
+    except (httpx.HTTPError, ValueError) as e:
+        raise WikidataUnavailable(str(e))
+
+    return next(iter(entities.values()), None)
+
+
+async def fetch_commons_thumbnails(names: list[str]) -> dict[str, str]:
+    """Nom -> vignette 800 px de la page Commons du même titre
+    (prop=pageimages), par lots. Repli des entités sans image P18 ;
+    une erreur réseau donne simplement moins de vignettes."""
+    thumbs: dict[str, str] = {}
+    for i in range(0, len(names), COMMONS_TITLES_BATCH):
+        batch = names[i:i + COMMONS_TITLES_BATCH]
+        params = {
+            "action": "query",
+            "format": "json",
+            "prop": "pageimages",
+            "piprop": "thumbnail",
+            "pithumbsize": 800,
+            "titles": "|".join(batch),
+        }
+        try:
+            r = await get_async_client().get(WIKIMEDIA_API, params=params, timeout=8)
+            r.raise_for_status()
+            query = r.json().get("query", {})
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"[WARN] Commons thumbnails unavailable: {e}")
+            continue
+
+        # Commons normalise les titres ("canis_lupus" -> "Canis lupus")
+        title_of = {n["from"]: n["to"] for n in query.get("normalized", [])}
+        by_title = {
+            page.get("title"): page["thumbnail"]["source"]
+            for page in query.get("pages", {}).values()
+            if page.get("thumbnail", {}).get("source")
+        }
+        for name in batch:
+            url = by_title.get(title_of.get(name, name))
+            if url:
+                thumbs[name] = url
+    return thumbs
+
+
+# ---------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------
+
+def parse_entity(entity: dict) -> dict:
+    """Extrait les propriétés utiles d'une entité Wikidata."""
+    claims = entity.get("claims", {})
 
     def get_prop(pid):
         """Retourne la valeur humaine d’une propriété Wikidata."""
@@ -85,3 +147,26 @@ def fetch_wikidata(scientific_name: str | None):
         "range_description": range_desc["text"] if isinstance(range_desc, dict) else None,
         "image_filename": image if isinstance(image, str) else None,
     }
+
+
+# ---------------------------------------------------------
+# Point d'entrée
+# ---------------------------------------------------------
+
+async def lookup_wikidata(scientific_name: str) -> tuple[str | None, dict | None]:
+    """Renvoie (qid, données) ; données None si l'espèce est introuvable.
+
+    Sans image P18, les données reçoivent la vignette Commons du même nom
+    (clé commons_thumbnail), même si l'entité Wikidata est introuvable.
+    Lève WikidataUnavailable en cas d'erreur transitoire.
+    """
+    qid = await search_qid(scientific_name)
+    entity = await fetch_entity(qid) if qid else None
+    data = parse_entity(entity) if entity else None
+
+    if not (data and data.get("image_filename")):
+        thumb = (await fetch_commons_thumbnails([scientific_name])).get(scientific_name)
+        if thumb:
+            data = {**(data or {}), "commons_thumbnail": thumb}
+    return qid, data
+
@@ -0,0 +1,151 @@
+# ecoatlas_api/services/year_index.py
+"""
+Index en mémoire "année -> espèces actives" pour le slider.
+
+Pour chaque année, un bitset (bytes, bit n = espèce d'id n) des espèces
+ayant au moins une occurrence telle que start_year <= année <= end_year.
+Construit une fois depuis la table occurrences, puis invalidé à chaque
+rechargement des données (/admin/reload, /admin/reset).
+
+La construction lit les occurrences en flux, triées par espèce : la
+mémoire dépend des bitsets et des intervalles d'une seule espèce, pas
+du nombre d'occurrences.
+"""
+
+from __future__ import annotations
+
+import threading
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+
+from .. import models
+from . import data_version
+
+# Positions des bits à 1 pour chaque valeur d'octet
+_BITS = [tuple(b for b in range(8) if v >> b & 1) for v in range(256)]
+
+STREAM_BATCH = 10_000   # lignes lues par aller-retour
+
+_index: "YearIndex | None" = None
+_lock = threading.Lock()
+
+
+class YearIndex:
+    def __init__(self, min_year: int, bitsets: list[bytes], all_ids: list[int]):
+        self.min_year = min_year
+        self.max_year = min_year + len(bitsets) - 1
+        self.bitsets = bitsets
+        # Toutes les espèces en base (y compris sans occurrence datée)
+        self.all_ids = all_ids
+
+    def bitset(self, year: int) -> bytes:
+        if not self.bitsets or year < self.min_year or year > self.max_year:
+            return b""
+        return self.bitsets[year - self.min_year]
+
+    def count(self, year: int) -> int:
+        return int.from_bytes(self.bitset(year), "little").bit_count()
+
+    def species_ids(self, year: int) -> list[int]:
+        """Ids (triés) des espèces actives pendant l'année."""
+        ids = []
+        for i, byte in enumerate(self.bitset(year)):
+            if byte:
+                base = i << 3
+                ids.extend(base + b for b in _BITS[byte])
+        return ids
+
+    def inactive_ids(self, year: int) -> list[int]:
+        """Complément de species_ids(year) parmi toutes les espèces."""
+        bits = self.bitset(year)
+        return [
+            sid for sid in self.all_ids
+            if (sid >> 3) >= len(bits) or not bits[sid >> 3] >> (sid & 7) & 1
+        ]
+
+
+# ---------------------------------------------------------
+# Construction
+# ---------------------------------------------------------
+
+def merge_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Fusionne des intervalles d'années fermés qui se chevauchent ou se touchent."""
+    intervals.sort()
+    merged = [intervals[0]]
+    for start, end in intervals[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def stream_by_species(query: Query):
+    """(species_id, [lignes]) espèce par espèce, query étant triée par
+    species_id (1re colonne) et lue par lots de STREAM_BATCH."""
+    for sid, rows in groupby(query.yield_per(STREAM_BATCH), key=itemgetter(0)):
+        yield sid, list(rows)
+
+
+def build_year_index(db: Session) -> YearIndex:
+    dated = (
+        models.Occurrence.species_id.isnot(None),
+        models.Occurrence.start_year.isnot(None),
+        models.Occurrence.end_year.isnot(None),
+        models.Occurrence.start_year <= models.Occurrence.end_year,
+    )
+    all_ids = [sid for (sid,) in db.query(models.Species.id).order_by(models.Species.id)]
+
+    # Bornes d'abord (agrégat SQL), pour dimensionner les bitsets
+    min_year, max_year, max_sid = db.query(
+        func.min(models.Occurrence.start_year),
+        func.max(models.Occurrence.end_year),
+        func.max(models.Occurrence.species_id),
+    ).filter(*dated).one()
+    if min_year is None:
+        return YearIndex(0, [], all_ids)
+
+    width = (max_sid >> 3) + 1
+    years = [bytearray(width) for _ in range(max_year - min_year + 1)]
+
+    rows = (
+        db.query(
+            models.Occurrence.species_id,
+            models.Occurrence.start_year,
+            models.Occurrence.end_year,
+        )
+        .filter(*dated)
+        .order_by(models.Occurrence.species_id)
+    )
+    # On fusionne d'abord les intervalles de chaque espèce : une espèce
+    # est marquée au plus une fois par année.
+    for sid, species_rows in stream_by_species(rows):
+        byte, mask = sid >> 3, 1 << (sid & 7)
+        for start, end in merge_intervals([(s, e) for _, s, e in species_rows]):
+            for y in range(start - min_year, end - min_year + 1):
+                years[y][byte] |= mask
+
+    return YearIndex(min_year, [bytes(b) for b in years], all_ids)
+
+
+def get_year_index(db: Session) -> YearIndex:
+    global _index
+    index = _index
+    if index is not None:
+        return index
+    with _lock:
+        if _index is None:
+            _index = build_year_index(db)
+        return _index
+
+
+@data_version.on_change
+def invalidate_year_index() -> None:
+    """Appelée à chaque changement du catalogue (cf. data_version)."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,52 @@
+# ecoatlas_api/startup_timing.py
+"""
+Mesure du démarrage à froid (instance Render free réveillée à la demande).
+
+main.py entoure chaque étape (imports, schéma, lifespan, warm-up) d'un
+`with phase("…")` ; le rapport est affiché au démarrage et renvoyé par
+GET /ready. Stdlib uniquement : ce module est importé en premier.
+"""
+
+import time
+from contextlib import contextmanager
+
+_t0 = time.perf_counter()
+_phases: list[tuple[str, float]] = []
+_ready_at: float | None = None
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+@contextmanager
+def phase(name: str):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, _ms(time.perf_counter() - t)))
+
+
+def mark_ready() -> None:
+    global _ready_at
+    if _ready_at is None:
+        _ready_at = time.perf_counter()
+
+
+def is_ready() -> bool:
+    return _ready_at is not None
+
+
+def report() -> dict:
+    return {
+        "phases_ms": dict(_phases),
+        "since_import_ms": _ms(time.perf_counter() - _t0),
+        "ready_after_ms": _ms(_ready_at - _t0) if _ready_at is not None else None,
+    }
+
+
+def print_report(title: str) -> None:
+    print(f"[STARTUP] {title}")
+    for name, ms in _phases:
+        print(f"[STARTUP]   {name:<32} {ms:8.1f} ms")
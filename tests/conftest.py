@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# database.py exige DATABASE_URL dès l'import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/tests.db")
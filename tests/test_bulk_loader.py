@@ -0,0 +1,45 @@
+# tests/test_bulk_loader.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from ecoatlas_api import models
+from ecoatlas_api.database import Base
+from ecoatlas_api.services import bulk_loader
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(models.Species(id=1, common_name="Lion", scientific_name="Panthera leo"))
+        session.commit()
+        yield session
+
+
+def test_upsert_occurrences_counts_rows_written(db):
+    rows = [
+        (1, 10.0, 20.0, 2000, 2000, "GBIF", 7),
+        (1, 11.0, 21.0, 2001, 2001, "GBIF", 7),   # même clé : la dernière gagne
+        (1, 12.0, 22.0, 2002, 2002, "GBIF", 8),
+    ]
+    assert bulk_loader.upsert_occurrences(db, rows) == 2
+    assert db.query(models.Occurrence).count() == 2
+    assert db.query(models.Occurrence.lat).filter_by(gbif_key=7).scalar() == 11.0
+
+
+def _index_names(db):
+    return {name for (name,) in db.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'occurrences'"
+    ))}
+
+
+def test_deferred_indexes_only_on_empty_table(db):
+    with bulk_loader.deferred_indexes(db, models.Occurrence):
+        assert "idx_occ_species" not in _index_names(db)
+    assert "idx_occ_species" in _index_names(db)
+
+    bulk_loader.insert_occurrences(db, [(1, 10.0, 20.0, 2000, 2000, "MANUAL")])
+    with bulk_loader.deferred_indexes(db, models.Occurrence):
+        assert "idx_occ_species" in _index_names(db)
@@ -0,0 +1,66 @@
+# tests/test_pagination.py
+import base64
+import json
+
+import pytest
+
+from ecoatlas_api.pagination import decode_cursor, encode_cursor
+from ecoatlas_api.services.search_index import SearchIndex
+
+
+def _raw_cursor(kind, value) -> str:
+    raw = json.dumps({"k": kind, "v": value}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def test_round_trip():
+    assert decode_cursor("species", encode_cursor("species", ("Loup", 12))) == ("Loup", 12)
+    assert decode_cursor("species", encode_cursor("species", (None, 3))) == (None, 3)
+    assert decode_cursor("search", encode_cursor("search", (-40, 4, "Loup", 12))) == (-40, 4, "Loup", 12)
+
+
+def test_search_index_keys_round_trip():
+    index = SearchIndex([
+        (1, "Loup gris", "Canis lupus"),
+        (2, "Loup à crinière", "Chrysocyon brachyurus"),
+        (3, None, "Canis lupus dingo"),
+        (4, "Louveteau", "Lupulella"),
+    ])
+    ranked = index.ranked("lup")
+    assert len(ranked) > 2
+    pages, after = [], None
+    while True:
+        page = index.page("lup", 1, after=after)
+        if not page:
+            break
+        pages += page
+        after = decode_cursor("search", encode_cursor("search", page[-1][0]))
+        assert after == page[-1][0]
+    assert pages == ranked
+
+
+@pytest.mark.parametrize(
+    "kind, value",
+    [
+        ("species", [1]),
+        ("species", [None, None]),
+        ("species", [1, 2, 3, 4, 5]),
+        ("species", ["Loup", "12"]),
+        ("species", ["Loup", True]),
+        ("species", ["Loup", 1.5]),
+        ("search", [-40, 4, "Loup"]),
+        ("search", [None, 4, "Loup", 12]),
+        ("search", [-40, 4, ["Loup"], 12]),
+        ("species", {"common_name": "Loup"}),
+    ],
+)
+def test_malformed_key_rejected(kind, value):
+    with pytest.raises(ValueError):
+        decode_cursor(kind, _raw_cursor(kind, value))
+
+
+def test_other_list_or_garbage_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor("species", encode_cursor("search", (-40, 4, "Loup", 12)))
+    with pytest.raises(ValueError):
+        decode_cursor("species", "pas-du-base64!")
@@ -0,0 +1,38 @@
+# tests/test_search_filter.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from ecoatlas_api import crud, models
+from ecoatlas_api.database import Base
+from ecoatlas_api.services import search_index
+
+
+NAMES = [
+    ("Éléphant d'Afrique", "Loxodonta africana"),
+    ("Elephant seal", "Mirounga leonina"),
+    ("Renard roux", "Vulpes vulpes"),
+]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(models.Species(common_name=c, scientific_name=s) for c, s in NAMES)
+        session.commit()
+        search_index.invalidate_search_index()
+        yield session
+    search_index.invalidate_search_index()
+
+
+def _matches(db, search):
+    q = db.query(models.Species.id).filter(crud.species_search_filter(db, search))
+    return sorted(i for (i,) in q)
+
+
+@pytest.mark.parametrize("max_ids", [crud.MAX_FILTER_IDS, 0])
+def test_accents_ignored_on_every_path(db, monkeypatch, max_ids):
+    monkeypatch.setattr(crud, "MAX_FILTER_IDS", max_ids)
+    assert _matches(db, "eleph") == _matches(db, "éléph") == [1, 2]
@@ -0,0 +1,27 @@
+# tests/test_spatial_index.py
+from ecoatlas_api.services.spatial_index import PolygonFilter
+
+
+def _band(west, south, east, north):
+    """Rectangle avec un sommet intermédiaire sur chaque bord horizontal :
+    aucune arête ne dépasse 180° de longitude."""
+    mid = (west + east) / 2
+    return [[(west, south), (mid, south), (east, south), (east, north), (mid, north), (west, north), (west, south)]]
+
+
+def test_wide_polygon_not_crossing_antimeridian():
+    poly = PolygonFilter([_band(-100.0, -10.0, 100.0, 10.0)])
+
+    assert not poly.unwrap
+    assert poly.bboxes() == [(-100.0, -10.0, 100.0, 10.0)]
+    assert poly.contains_many([0.0, 0.0, 0.0], [0.0, 150.0, -150.0]) == [True, False, False]
+
+
+def test_polygon_crossing_antimeridian():
+    # De 170°E à 170°W en passant par 180°
+    ring = [(170.0, -10.0), (-170.0, -10.0), (-170.0, 10.0), (170.0, 10.0), (170.0, -10.0)]
+    poly = PolygonFilter([[ring]])
+
+    assert poly.unwrap
+    assert poly.bboxes() == [(170.0, -10.0, 180.0, 10.0), (-180.0, -10.0, -170.0, 10.0)]
+    assert poly.contains_many([0.0, 0.0, 0.0], [175.0, -175.0, 0.0]) == [True, True, False]
@@ -0,0 +1,51 @@
+# tests/test_tile_service.py
+import math
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from ecoatlas_api import models
+from ecoatlas_api.database import Base
+from ecoatlas_api.services import tile_service
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        tile_service.clear_tile_cache()
+        yield session
+    tile_service.clear_tile_cache()
+
+
+def _add(db, points):
+    """points : [(lat, lng)], une espèce par point."""
+    for i, (lat, lng) in enumerate(points):
+        sp = models.Species(common_name=f"Espèce {i}", scientific_name=f"Species {i}")
+        db.add(sp)
+        db.flush()
+        db.add(models.Occurrence(species_id=sp.id, lat=lat, lng=lng))
+    db.commit()
+
+
+def test_edge_points_counted_in_last_cell(db):
+    # lng juste sous 180 : l'indice de colonne arrondit à TILE_GRID_SIZE
+    _add(db, [(10.0, math.nextafter(180.0, 0.0)), (10.0, 179.0)])
+    tile = tile_service.get_tile(db, 0, 0, 0)
+    assert tile["total"] == 2
+    assert tile["clusters"] == [
+        {"lat": 10.0, "lng": pytest.approx(179.5), "count": 2, "species_count": 2}
+    ]
+
+
+def test_cache_bounded_by_clusters(db, monkeypatch):
+    _add(db, [(10.0, -170.0), (10.0, 10.0), (-40.0, 100.0)])
+    monkeypatch.setattr(tile_service, "TILE_CACHE_CLUSTERS", 4)
+    for x in range(2):
+        for y in range(2):
+            tile_service.get_tile(db, 1, x, y)
+    tile_service.get_tile(db, 0, 0, 0)  # 3 clusters
+    assert tile_service._cached_clusters <= 4
+    assert (0, 0, 0, None, None, None, None) in tile_service._cache